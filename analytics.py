@@ -0,0 +1,123 @@
+# analytics.py
+import threading
+
+import pandas as pd
+
+from match_store import get_store
+
+AGES = ("feudal", "castle", "empire")
+
+# One row per (game, player); review fields are pulled out of the player-input JSON by SQLite
+PLAYER_ROWS_SQL = """
+SELECT
+    p.game_id, p.profile_id, p.name, p.civilization, p.team, p.result, p.mmr,
+    m.started_at, m.map, m.kind, m.duration,
+    json_extract(m.player_input, '$."' || p.profile_id || '"."feudal-time"') AS feudal_time,
+    json_extract(m.player_input, '$."' || p.profile_id || '"."feudal-dropdown"') AS feudal_landmark,
+    json_extract(m.player_input, '$."' || p.profile_id || '"."castle-time"') AS castle_time,
+    json_extract(m.player_input, '$."' || p.profile_id || '"."castle-dropdown"') AS castle_landmark,
+    json_extract(m.player_input, '$."' || p.profile_id || '"."empire-time"') AS empire_time,
+    json_extract(m.player_input, '$."' || p.profile_id || '"."empire-dropdown"') AS empire_landmark
+FROM match_players p
+JOIN matches m ON m.game_id = p.game_id
+{where}
+"""
+
+
+def _time_to_seconds(values):
+    # Reviewers enter game time in the time inputs as MM:SS (the browser labels the fields HH:MM)
+    parts = values.str.split(":", n=2, expand=True)
+    if parts.shape[1] < 2:
+        return pd.Series(float("nan"), index=values.index)
+    minutes = pd.to_numeric(parts[0], errors="coerce")
+    seconds = pd.to_numeric(parts[1], errors="coerce")
+    return minutes * 60 + seconds
+
+
+def load_player_frame(store=None, reviewed_only=False):
+    store = store or get_store()
+    where = "WHERE m.player_input IS NOT NULL" if reviewed_only else ""
+    frame = pd.read_sql_query(PLAYER_ROWS_SQL.format(where=where), store.connection())
+    frame["started_at"] = pd.to_datetime(frame["started_at"], utc=True, format="ISO8601")
+    frame["win"] = (frame["result"] == "win").astype("float64")
+    frame.loc[~frame["result"].isin(["win", "loss"]), "win"] = float("nan")
+    for age in AGES:
+        frame[f"{age}_seconds"] = _time_to_seconds(frame[f"{age}_time"].astype("string"))
+    for column in ("civilization", "map", "kind", "feudal_landmark", "castle_landmark", "empire_landmark"):
+        frame[column] = frame[column].astype("category")
+    return frame
+
+
+def win_rate_by(frame, columns):
+    grouped = frame.groupby(columns, observed=True)["win"]
+    return pd.DataFrame({"games": grouped.count(), "win_rate": grouped.mean()}).reset_index()
+
+
+def landmark_win_rates(frame):
+    # Stacks the three age columns so every (age, landmark) pick is one row
+    picks = pd.concat(
+        [
+            frame[["civilization", f"{age}_landmark", "win"]]
+            .rename(columns={f"{age}_landmark": "landmark"})
+            .assign(age=age)
+            for age in AGES
+        ],
+        ignore_index=True,
+    ).dropna(subset=["landmark"])
+    return win_rate_by(picks, ["civilization", "age", "landmark"])
+
+
+def average_age_up_times(frame, by="civilization"):
+    columns = [f"{age}_seconds" for age in AGES]
+    return frame.groupby(by, observed=True)[columns].mean().reset_index()
+
+
+def mmr_trend(frame, profile_id, freq="W"):
+    player = frame[frame["profile_id"] == int(profile_id)]
+    return player.set_index("started_at")["mmr"].resample(freq).mean().dropna().reset_index()
+
+
+class ReviewStats:
+    """Aggregates over the stored reviews, recomputed only when a review is added or edited."""
+
+    def __init__(self, store=None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._results = {}
+
+    def _refresh(self):
+        store = self.store or get_store()
+        fingerprint = store.fingerprint()
+        if fingerprint != self._fingerprint:
+            frame = load_player_frame(store, reviewed_only=True)
+            self._results = {
+                "frame": frame,
+                "by_civ": win_rate_by(frame, "civilization"),
+                "by_map": win_rate_by(frame, "map"),
+                "by_civ_map": win_rate_by(frame, ["civilization", "map"]),
+                "by_landmark": landmark_win_rates(frame),
+                "age_up_times": average_age_up_times(frame),
+            }
+            self._fingerprint = fingerprint
+        return self._results
+
+    def get(self, name):
+        with self._lock:
+            return self._refresh()[name]
+
+    def mmr_trend(self, profile_id, freq="W"):
+        return mmr_trend(self.get("frame"), profile_id, freq)
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_review_stats():
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = ReviewStats()
+    return _stats
@@ -0,0 +1,185 @@
+# api_client.py
+import asyncio
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache_backend import make_cache
+from metrics import record_upstream
+
+API_BASE_URL = os.environ.get("AOE4WORLD_API_URL", "https://aoe4world.com/api/v0")
+
+# (connect, read) timeouts in seconds, so a stalled upstream can't pin a worker
+DEFAULT_TIMEOUT = (3.05, 10)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Page size used for "recent matches"; "last match" lookups fetch the same page so both share a cache entry
+RECENT_LIMIT = 10
+HISTORY_PAGE_SIZE = 50
+
+# Upstream requests per second for one process (user lookups and background prefetch). Each gunicorn
+# worker has its own bucket, so the deployment's ceiling is workers x RATE_LIMIT; divide the budget
+# by the worker count. Only one process runs the prefetcher (see prefetch.LOCK_PATH).
+RATE_LIMIT = float(os.environ.get("AOE4WORLD_RATE_LIMIT", "5"))
+
+
+class RateLimiter:
+    """Token bucket shared by every upstream request made through a client."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Aoe4WorldClient:
+    def __init__(self, base_url=API_BASE_URL, timeout=DEFAULT_TIMEOUT, retries=3,
+                 backoff_factor=0.5, pool_size=10, cache_ttl=60, cache_size=256, rate_limit=RATE_LIMIT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate_limit, burst=pool_size) if rate_limit else None
+        self.cache = make_cache("api", maxsize=cache_size, ttl=cache_ttl)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/json"})
+
+    def get_games(self, player_id, limit=RECENT_LIMIT):
+        key = (str(player_id), limit)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self._single_flight(key, lambda: self._get(f"/players/{player_id}/games", params={"limit": limit}))
+
+    def refresh_games(self, player_id, limit=RECENT_LIMIT, ttl=None):
+        # Always hits upstream and replaces the cached page; used by the background prefetcher
+        key = (str(player_id), limit)
+        return self._single_flight(key, lambda: self._get(f"/players/{player_id}/games", params={"limit": limit}), ttl)
+
+    def get_latest_games(self, player_id, max_age=30):
+        # Any cached page for this player that is fresh enough already contains the newest game
+        for _, data in self.cache.fresh_items(max_age, prefix=(str(player_id),)):
+            if data.get("games"):
+                return data
+        return self.get_games(player_id, RECENT_LIMIT)
+
+    def get_games_page(self, player_id, page=1, limit=HISTORY_PAGE_SIZE):
+        # Archive pages shift as new games arrive, so they bypass the response cache
+        return self._get(f"/players/{player_id}/games", params={"page": page, "limit": limit})
+
+    def _single_flight(self, key, fetch, ttl=None):
+        # Concurrent callers asking for the same key wait on a single upstream request
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+            self.cache.set(key, call.result, ttl)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def _get(self, path, params=None):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        endpoint = path.rsplit("/", 1)[-1]
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            record_upstream(endpoint, "error", time.perf_counter() - start, None)
+            raise
+        record_upstream(endpoint, response.status_code, time.perf_counter() - start, len(response.content))
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = Aoe4WorldClient()
+    return _client
+
+
+async def fetch_games_batch(player_ids, limit=RECENT_LIMIT, concurrency=5, client=None):
+    # Runs the blocking lookups on the default executor so they share the pooled session;
+    # total latency tracks the slowest request instead of the sum.
+    client = client or get_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def fetch_one(player_id):
+        async with semaphore:
+            try:
+                return player_id, await loop.run_in_executor(None, client.get_games, player_id, limit)
+            except requests.exceptions.RequestException as e:
+                return player_id, {"error": str(e)}
+
+    return dict(await asyncio.gather(*(fetch_one(player_id) for player_id in player_ids)))
+
+
+def set_client(client):
+    # Lets benchmarks or a local stub server swap in a differently configured client
+    global _client
+    with _client_lock:
+        _client = client
@@ -1,19 +1,31 @@
 # app.py
+import os
+
 import dash
 import dash_bootstrap_components as dbc
 from dash import dcc, html
 
 from callback import register_callbacks
-from util import deserialize_historical_match
+from review_archive import register_archive_routes
+from prefetch import start_prefetch_worker
+from metrics import register_metrics_route
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+TAILWIND_CDN = 'https://cdnjs.cloudflare.com/ajax/libs/tailwindcss/2.2.19/tailwind.min.css'
+# Dash serves assets/ itself, with a modification-time query string on every URL;
+# fall back to the CDN build until `npm run build:css` has produced the local file
+LOCAL_TAILWIND = os.path.exists(os.path.join(ASSETS_DIR, "tailwind.css"))
+# Asset URLs change whenever the file does, so browsers may keep them for a year
+ASSET_MAX_AGE = 365 * 24 * 3600
 
 # Initialize the Dash app
 app = dash.Dash(
     __name__, 
+    assets_folder=ASSETS_DIR,
     external_stylesheets=[
         dbc.themes.BOOTSTRAP, 
         dbc.icons.BOOTSTRAP, 
-        'https://cdnjs.cloudflare.com/ajax/libs/tailwindcss/2.2.19/tailwind.min.css'
-    ]
+    ] + ([] if LOCAL_TAILWIND else [TAILWIND_CDN])
 )
 
 app.title = "Age of Empires 4 Match History"
@@ -22,6 +34,8 @@ app.layout = dbc.Container(
     [
         dcc.Store(id='match-store'),
         dcc.Store(id='recent-match-store'),
+        dcc.Store(id='match-list-state'),
+        dcc.Store(id='selected-game'),
         dbc.Row(
             dbc.Col(
                 html.H1("AOE4 Replay Reviewer", className="text-center my-4 text-4xl font-bold")
@@ -33,7 +47,7 @@ app.layout = dbc.Container(
                     dcc.Input(
                         id="player-id-input",
                         type="text",
-                        placeholder="Enter Player ID, you can find player ID on aoe4world.com",
+                        placeholder="Enter Player ID, you can find player ID on aoe4world.com (separate several IDs with commas)",
                         persistence=True,
                         className="form-control mb-3"
                     ),
@@ -59,6 +73,16 @@ app.layout = dbc.Container(
                     ),
                     width="auto"
                 ),
+                dbc.Col(
+                    dbc.Button(
+                        "Saved Matches",
+                        id="saved-match-button",
+                        color="primary",
+                        className="mb-3",
+                        style={"margin-right": "20px"},
+                    ),
+                    width="auto"
+                ),
                 dbc.Col(
                     dcc.Upload(
                         id="upload-data",
@@ -71,13 +95,57 @@ app.layout = dbc.Container(
                     ),
                     width="auto"
                 ),
+                dbc.Col(
+                    dcc.Upload(
+                        id="bulk-upload-data",
+                        children=dbc.Button(
+                            "Import Reviews",
+                            color="secondary",
+                            className="mb-3"
+                        ),
+                        multiple=True
+                    ),
+                    width="auto"
+                ),
+                dbc.Col(
+                    html.A(
+                        dbc.Button(
+                            "Export All Reviews",
+                            color="secondary",
+                            className="mb-3"
+                        ),
+                        href="/export/reviews.zip"
+                    ),
+                    width="auto"
+                ),
+                dbc.Col(html.Div(id="bulk-import-status", className="mb-3 text-sm"), width=12),
+                dbc.Col(
+                    dcc.Input(
+                        id="review-search-input",
+                        type="search",
+                        placeholder="Search saved reviews, e.g. tower rush english",
+                        debounce=True,
+                        className="form-control mb-3"
+                    ),
+                    width=12
+                ),
             ],
             align="center",
             justify="start"
         ),
         dbc.Card(
             dbc.CardBody(
-                html.Div(id="recent-match-info")
+                [
+                    html.Div(id="recent-match-info"),
+                    html.Div(
+                        [
+                            dbc.Button("Prev", id="prev-page-button", size="sm", color="secondary", outline=True),
+                            html.Span(id="match-page-label", className="mx-3 text-sm"),
+                            dbc.Button("Next", id="next-page-button", size="sm", color="secondary", outline=True),
+                        ],
+                        className="flex items-center mt-2"
+                    ),
+                ]
             ),
             id="recent-match-card",
             className="hover:bg-gray-200 transition duration-300 ease-in-out",
@@ -94,6 +162,11 @@ app.layout = dbc.Container(
                 dbc.Col(html.Div(id="opponent-team-info"), width=6)
             ]
         ),
+        dbc.Row(
+            [
+                dbc.Col(html.Div(id="scouting-info"), width=12),
+            ]
+        ),
         dbc.Row(
             dbc.Col(
                 [
@@ -104,6 +177,23 @@ app.layout = dbc.Container(
                         color="primary",
                         className="size-4",
                         style={"display": "none"}
+                    ),
+                    dbc.Button(
+                        "Recent games of these players",
+                        id="match-players-button",
+                        color="secondary",
+                        className="size-4 ml-2",
+                        style={"display": "none"}
+                    ),
+                    dbc.RadioItems(
+                        id="export-format",
+                        options=[
+                            {"label": "JSON", "value": "json"},
+                            {"label": "Compressed (.json.gz)", "value": "json.gz"},
+                        ],
+                        value="json",
+                        inline=True,
+                        className="mt-2 text-sm"
                     )
                 ]
             )
@@ -116,6 +206,12 @@ app.layout = dbc.Container(
 register_callbacks(app)
 
 server = app.server
+server.config["SEND_FILE_MAX_AGE_DEFAULT"] = ASSET_MAX_AGE
+register_archive_routes(server)
+register_metrics_route(server)
+
+# Warms caches for the players listed in AOE4_WATCH_LIST; does nothing when it is unset
+start_prefetch_worker()
 
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -0,0 +1,72 @@
+// assets/clientside.js
+// Callbacks that only need browser state; Dash loads every script in assets/ automatically.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    reviewer: {
+        selectGame: function (linkClicks, recentMatches) {
+            const triggered = dash_clientside.callback_context.triggered;
+            // New game links mount with n_clicks=null, which is not a selection
+            if (!triggered.length || !triggered[0].value || !recentMatches) {
+                return dash_clientside.no_update;
+            }
+            const index = dash_clientside.callback_context.triggered_id.index;
+            // The timestamp makes clicking the same game twice still count as a change
+            return {game_id: recentMatches[index], selected_at: Date.now()};
+        },
+
+        toggleDownload: function (gameId) {
+            return gameId == null ? {display: "none"} : {display: "inline-block"};
+        },
+
+        downloadReview: async function (nClicks, ids, feudalTimes, feudalDropdowns, castleTimes,
+                                        castleDropdowns, empireTimes, empireDropdowns, strategies,
+                                        improvements, gameId, exportFormat) {
+            if (!nClicks || gameId == null) {
+                return dash_clientside.no_update;
+            }
+            const playerInput = {};
+            ids.forEach(function (id, i) {
+                playerInput[id.player_id] = {
+                    "feudal-time": feudalTimes[i],
+                    "feudal-dropdown": feudalDropdowns[i],
+                    "castle-time": castleTimes[i],
+                    "castle-dropdown": castleDropdowns[i],
+                    "empire-time": empireTimes[i],
+                    "empire-dropdown": empireDropdowns[i],
+                    "strategy-input": strategies[i],
+                    "improve-input": improvements[i],
+                };
+            });
+
+            // Autosave keeps the stored review current; the fields on screen still win in case
+            // the last edit's save hasn't landed yet
+            const response = await fetch("/export/match/" + encodeURIComponent(gameId));
+            if (!response.ok) {
+                return dash_clientside.no_update;
+            }
+            const review = await response.json();
+            review.match["player-input"] = playerInput;
+
+            if (exportFormat === "json.gz" && window.CompressionStream) {
+                const minified = new Blob([JSON.stringify(review.match)]);
+                const compressed = minified.stream().pipeThrough(new CompressionStream("gzip"));
+                const bytes = new Uint8Array(await new Response(compressed).arrayBuffer());
+                let binary = "";
+                for (let i = 0; i < bytes.length; i += 0x8000) {
+                    binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+                }
+                return {
+                    content: btoa(binary),
+                    filename: review.filename + ".json.gz",
+                    type: "application/gzip",
+                    base64: true,
+                };
+            }
+            return {
+                content: JSON.stringify(review.match, null, 4),
+                filename: review.filename + ".json",
+                type: "application/json",
+                base64: false,
+            };
+        },
+    },
+});
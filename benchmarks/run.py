@@ -0,0 +1,221 @@
+# benchmarks/run.py
+# Times the request/render pipeline against the local stub and measures the bytes its Dash callbacks
+# send and receive, writing the results as JSON so runs from different commits can be compared.
+#
+#   python -m benchmarks.run [--repeat 50] [--output results.json] [--compare previous.json]
+import argparse
+import base64
+import gzip
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.common import RESULTS_DIR, git_commit
+
+# Keep the benchmark's match store away from ./data; must be set before the app modules load
+os.environ.setdefault("AOE4_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="aoe4-bench-"), "matches.sqlite3"))
+
+import api_client  # noqa: E402
+import util  # noqa: E402
+from benchmarks.stub_server import start_stub_server  # noqa: E402
+from review_format import decode_review  # noqa: E402
+
+PLAYERS = {"1v1": "1001", "4v4": "4001"}
+
+
+def _time(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "n": repeat,
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+    }
+
+
+def _dash_post(test_client, outputs, inputs, state, changed):
+    # Returns the request body and the response, as the browser would send and receive them
+    output = "...".join(f"{o['id']}.{o['property']}" for o in outputs)
+    body = json.dumps(
+        {"output": f"..{output}..", "outputs": outputs, "inputs": inputs, "state": state, "changedPropIds": changed},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    response = test_client.post("/_dash-update-component", data=body, content_type="application/json")
+    assert response.status_code == 200, response.status_code
+    return body, response
+
+
+def _dash_update(test_client, outputs, inputs, state, changed):
+    return _dash_post(test_client, outputs, inputs, state, changed)[1].get_json()
+
+
+def _payload_bytes(request_body, response):
+    return {"request": len(request_body), "response": len(response.get_data())}
+
+
+def run(repeat):
+    # Returns (stage timings, payload bytes of the review flow's requests)
+    server, base_url = start_stub_server()
+    stages = {}
+    payloads = {}
+    try:
+        fresh_client = lambda: api_client.Aoe4WorldClient(base_url=base_url, rate_limit=None)  # noqa: E731
+        api_client.set_client(fresh_client())
+
+        from app import server as flask_server
+        test_client = flask_server.test_client()
+
+        for label, player_id in PLAYERS.items():
+            def fetch_cold():
+                api_client.set_client(fresh_client())
+                util.fetch_recent_matches(player_id)
+
+            stages[f"{label}.fetch_cold"] = _time(fetch_cold, repeat)
+            stages[f"{label}.fetch_cached"] = _time(lambda: util.fetch_recent_matches(player_id), repeat)
+
+            match = util.get_last_match_data(player_id)
+            stages[f"{label}.get_player_info_from_last_match"] = _time(
+                lambda: util.get_player_info_from_last_match(match), repeat
+            )
+
+            def render_cold():
+                util._player_card_cache.clear()
+                util.match_info_to_display(match, player_id)
+
+            stages[f"{label}.match_info_to_display_cold"] = _time(render_cold, repeat)
+            stages[f"{label}.match_info_to_display_cached"] = _time(
+                lambda: util.match_info_to_display(match, player_id), repeat
+            )
+
+            reviewed = dict(match)
+            reviewed["player-input"] = {
+                str(info["profile_id"]): {"strategy-input": "Fast castle into knights. " * 20}
+                for info in util.get_player_info_from_last_match(match)
+            }
+            # The browser builds the file; the server half of a download is the export route
+            export_url = f"/export/match/{match['game_id']}"
+            assert test_client.get(export_url).status_code == 200
+            stages[f"{label}.download"] = _time(lambda: test_client.get(export_url).get_data(), repeat)
+            # Same bytes as the browser's .json and .json.gz downloads
+            files = {
+                "json": json.dumps(reviewed, ensure_ascii=False, indent=4).encode("utf-8"),
+                "json.gz": gzip.compress(json.dumps(reviewed, ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+            }
+            for fmt, raw in files.items():
+                data_url = "data:application/octet-stream;base64," + base64.b64encode(raw).decode()
+                stages[f"{label}.upload_{fmt}"] = _time(
+                    lambda: decode_review(base64.b64decode(data_url.split(",", 1)[1])), repeat
+                )
+
+            recent_outputs = [
+                {"id": "recent-match-info", "property": "children"},
+                {"id": "recent-match-store", "property": "data"},
+                {"id": "match-list-state", "property": "data"},
+                {"id": "match-page-label", "property": "children"},
+            ]
+            recent_inputs = [
+                {"id": "recent-match-button", "property": "n_clicks", "value": 1},
+                {"id": "saved-match-button", "property": "n_clicks", "value": None},
+                {"id": "prev-page-button", "property": "n_clicks", "value": None},
+                {"id": "next-page-button", "property": "n_clicks", "value": None},
+                {"id": "review-search-input", "property": "value", "value": None},
+                {"id": "match-players-button", "property": "n_clicks", "value": None},
+            ]
+            recent_state = [
+                {"id": "player-id-input", "property": "value", "value": player_id},
+                {"id": "match-list-state", "property": "data", "value": None},
+                {"id": "match-store", "property": "data", "value": None},
+            ]
+            stages[f"{label}.callback_update_recent_matches"] = _time(
+                lambda: _dash_update(test_client, recent_outputs, recent_inputs, recent_state, ["recent-match-button.n_clicks"]),
+                repeat,
+            )
+
+            # Bytes on the wire for one review flow: list recent games, open one, download it
+            body, response = _dash_post(test_client, recent_outputs, recent_inputs, recent_state, ["recent-match-button.n_clicks"])
+            payloads[f"{label}.update_recent_matches"] = _payload_bytes(body, response)
+            handles = response.get_json()["response"]["recent-match-store"]["data"]
+            body, response = _dash_post(
+                test_client,
+                [
+                    {"id": "my-team-info", "property": "children"},
+                    {"id": "opponent-team-info", "property": "children"},
+                    {"id": "game-info", "property": "children"},
+                    {"id": "match-store", "property": "data"},
+                ],
+                [
+                    {"id": "fetch-button", "property": "n_clicks", "value": None},
+                    {"id": "upload-data", "property": "contents", "value": None},
+                    {"id": "selected-game", "property": "data", "value": {"game_id": handles[0], "selected_at": 1}},
+                ],
+                [
+                    {"id": "player-id-input", "property": "value", "value": player_id},
+                    {"id": "upload-data", "property": "filename", "value": None},
+                ],
+                ["selected-game.data"],
+            )
+            payloads[f"{label}.update_match_info"] = _payload_bytes(body, response)
+            payloads[f"{label}.export_match"] = _payload_bytes(b"", test_client.get(f"/export/match/{handles[0]}"))
+    finally:
+        server.shutdown()
+    return stages, payloads
+
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output")
+    parser.add_argument("--compare", help="previous results file to diff against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    stages, payloads = run(args.repeat)
+    results = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "stages": stages,
+        "payload_bytes": payloads,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    previous = None
+    previous_payloads = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous_file:
+            previous_results = json.load(previous_file)
+        previous = previous_results["stages"]
+        previous_payloads = previous_results.get("payload_bytes", {})
+
+    for name, stage in results["stages"].items():
+        line = f"{name:48} p50 {stage['p50_ms']:9.3f} ms  p95 {stage['p95_ms']:9.3f} ms"
+        if previous and name in previous and previous[name]["p50_ms"]:
+            line += f"  ({stage['p50_ms'] / previous[name]['p50_ms']:.2f}x)"
+        print(line)
+    for name, sizes in results["payload_bytes"].items():
+        line = f"{name:48} request {sizes['request']:>8} B  response {sizes['response']:>8} B"
+        if name in previous_payloads:
+            before = previous_payloads[name]
+            line += f"  (was {before['request']} / {before['response']} B)"
+        print(line)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
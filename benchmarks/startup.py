@@ -0,0 +1,135 @@
+# benchmarks/startup.py
+# Profiles a cold worker: where `import app` spends its time (from -X importtime) and how long a
+# fresh process takes to answer its first request. Exits non-zero when time-to-first-response
+# misses the budget, so it can gate deploys.
+#
+#   python -m benchmarks.startup [--runs 5] [--budget 1.5] [--top 15] [--output startup.json]
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.common import RESULTS_DIR, ROOT, git_commit
+
+# Median seconds from spawning a worker to a 200 on both "/" and "/_dash-layout"
+TTFR_BUDGET = 1.5
+
+SERVE_SNIPPET = """
+from werkzeug.serving import make_server
+from app import server
+httpd = make_server("127.0.0.1", 0, server, threaded=True)
+print(httpd.server_port, flush=True)
+httpd.serve_forever()
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("AOE4_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="aoe4-startup-"), "matches.sqlite3"))
+    env.pop("AOE4_WATCH_LIST", None)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _own_modules():
+    return {name[:-3] for name in os.listdir(ROOT) if name.endswith(".py")}
+
+
+def import_profile(top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append({"module": name.strip(), "depth": depth, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+
+    own = _own_modules()
+    # importtime lists a module after everything it imported: app's subtree is the run of nested
+    # entries just before it
+    end = next(index for index, module in enumerate(modules) if module["module"] == "app" and module["depth"] == 0)
+    start = end
+    while start > 0 and modules[start - 1]["depth"] > 0:
+        start -= 1
+    direct = [module for module in modules[start:end] if module["depth"] == 1]
+    return {
+        "app_ms": modules[end]["cumulative_ms"],
+        "direct": sorted(direct, key=lambda module: -module["cumulative_ms"])[:top],
+        "slowest_self": sorted(modules, key=lambda module: -module["self_ms"])[:top],
+        "own": [module for module in modules if module["module"] in own],
+    }
+
+
+def time_to_first_response(timeout=30):
+    start = time.perf_counter()
+    worker = subprocess.Popen(
+        [sys.executable, "-c", SERVE_SNIPPET], cwd=ROOT, env=_env(),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        port = int(worker.stdout.readline())
+        timings = {"listening_s": time.perf_counter() - start}
+        for path in ("/", "/_dash-layout"):
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout) as response:
+                response.read()
+                assert response.status == 200, response.status
+        timings["ttfr_s"] = time.perf_counter() - start
+        return timings
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=TTFR_BUDGET, help="seconds allowed for the median TTFR")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    profile = import_profile(args.top)
+    runs = [time_to_first_response() for _ in range(args.runs)]
+    ttfr = statistics.median(run["ttfr_s"] for run in runs)
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "imports": profile,
+        "runs": runs,
+        "ttfr_median_s": ttfr,
+        "budget_s": args.budget,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"startup-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    print(f"import app: {profile['app_ms']:.1f} ms")
+    for module in profile["direct"]:
+        print(f"  {module['module']:40} {module['cumulative_ms']:9.1f} ms")
+    print("own modules (self / cumulative):")
+    for module in profile["own"]:
+        print(f"  {module['module']:40} {module['self_ms']:9.1f} / {module['cumulative_ms']:.1f} ms")
+    print(f"time to first response: median {ttfr:.3f} s over {args.runs} runs (budget {args.budget:.3f} s)")
+    print(f"Saved {output}")
+    if ttfr > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/stub_server.py
+# Local stand-in for aoe4world's /api/v0/players/{id}/games endpoint serving synthetic payloads.
+# Profile IDs 4000-4999 get 4v4 games, everything else 1v1.
+#
+#   python -m benchmarks.stub_server --port 8765
+#   AOE4WORLD_API_URL=http://127.0.0.1:8765/api/v0 python app.py
+import argparse
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import synthetic_match
+
+GAMES_PATH = re.compile(r"^/api/v0/players/(\d+)/games$")
+HISTORY_LENGTH = 500
+
+
+def team_size_for(player_id):
+    return 4 if 4000 <= player_id < 5000 else 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    payload_cache = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        found = GAMES_PATH.match(url.path)
+        if not found:
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        player_id = int(found.group(1))
+        limit = int(query.get("limit", ["10"])[0])
+        page = int(query.get("page", ["1"])[0])
+
+        key = (player_id, limit, page)
+        body = self.payload_cache.get(key)
+        if body is None:
+            start = (page - 1) * limit
+            game_ids = range(HISTORY_LENGTH - start, max(HISTORY_LENGTH - start - limit, 0), -1)
+            games = [synthetic_match(player_id * 1000 + game_id, team_size_for(player_id)) for game_id in game_ids]
+            body = json.dumps({"page": page, "per_page": limit, "count": HISTORY_LENGTH, "games": games}).encode("utf-8")
+            self.payload_cache[key] = body
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host="127.0.0.1", port=0):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_port}/api/v0"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Serving stub aoe4world API on http://{args.host}:{args.port}/api/v0")
+    server.serve_forever()
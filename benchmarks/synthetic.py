@@ -0,0 +1,89 @@
+# benchmarks/synthetic.py
+import random
+from datetime import datetime, timedelta, timezone
+
+import constants
+
+MAPS = ["Dry Arabia", "Altai", "Ancient Spires", "Hill and Dale", "Mongolian Heights", "Lipany"]
+KINDS = {1: "rm_1v1", 2: "rm_2v2", 3: "rm_3v3", 4: "rm_4v4"}
+
+NOTE = (
+    "Opened with a fast feudal, two archery ranges and a tower on the gold. "
+    "Scouted the opponent's sacred site timing late, lost villagers to raids at 7 minutes. "
+)
+
+
+def synthetic_match(game_id, team_size=1, seed=None, with_review=False, note_repeat=4):
+    # Shape follows aoe4world's /api/v0/players/{id}/games payload
+    rng = random.Random(seed if seed is not None else game_id)
+    civs = list(constants.AOE4_LANDMARKS_BY_CIV)
+    started_at = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=37 * (game_id % 100000))
+    winning_team = rng.randint(0, 1)
+
+    teams = []
+    for team_index in range(2):
+        team = []
+        for slot in range(team_size):
+            mmr = rng.randint(800, 2000)
+            team.append({
+                "player": {
+                    "name": f"Player {team_index}-{slot}",
+                    "profile_id": 10000 + team_index * 100 + slot + (game_id % 7) * 1000,
+                    "result": "win" if team_index == winning_team else "loss",
+                    "civilization": rng.choice(civs),
+                    "civilization_randomized": False,
+                    "rating": mmr,
+                    "rating_diff": rng.randint(-30, 30),
+                    "mmr": mmr,
+                    "mmr_diff": rng.randint(-30, 30),
+                    "input_type": "keyboard",
+                }
+            })
+        teams.append(team)
+
+    match = {
+        "game_id": game_id,
+        "started_at": started_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "updated_at": started_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "duration": rng.randint(600, 3600),
+        "map": rng.choice(MAPS),
+        "kind": KINDS[team_size],
+        "leaderboard": KINDS[team_size],
+        "mmr_leaderboard": KINDS[team_size],
+        "season": 8,
+        "server": "Europe",
+        "patch": 11060,
+        "average_rating": 1400,
+        "average_rating_deviation": 120,
+        "average_mmr": 1400,
+        "average_mmr_deviation": 120,
+        "ongoing": False,
+        "just_finished": False,
+        "teams": teams,
+    }
+    if with_review:
+        match["player-input"] = synthetic_review(match, note_repeat)
+    return match
+
+
+def synthetic_review(match, note_repeat=4):
+    review = {}
+    for team in match["teams"]:
+        for player_data in team:
+            player = player_data["player"]
+            landmarks = constants.AOE4_LANDMARKS_BY_CIV[player["civilization"]]
+            review[str(player["profile_id"])] = {
+                "feudal-time": "05:10",
+                "feudal-dropdown": landmarks["feudal"][0],
+                "castle-time": "13:40",
+                "castle-dropdown": landmarks["castle"][0],
+                "empire-time": None,
+                "empire-dropdown": None,
+                "strategy-input": NOTE * note_repeat,
+                "improve-input": NOTE * note_repeat,
+            }
+    return review
+
+
+def synthetic_games_page(count=10, team_size=1, start_id=1):
+    return {"games": [synthetic_match(start_id + i, team_size) for i in range(count)]}
@@ -0,0 +1,238 @@
+# cache_backend.py
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from metrics import record_cache
+
+# "memory" keeps each gunicorn worker's cache private; "sqlite" shares one cache file between workers
+CACHE_BACKEND = os.environ.get("AOE4_CACHE_BACKEND", "memory")
+CACHE_PATH = os.environ.get("AOE4_CACHE_PATH", "./data/cache.sqlite3")
+
+
+class CacheBackend(ABC):
+    """Interface shared by the cache implementations: LRU eviction past `maxsize`, per-entry TTL."""
+
+    @abstractmethod
+    def get(self, key, default=None):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+    @abstractmethod
+    def fresh_items(self, max_age, prefix=()):
+        # (key, value) pairs stored within the last `max_age` seconds and not yet expired; a
+        # non-empty `prefix` keeps only the tuple keys that start with it
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe in-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, name, maxsize=256, ttl=60, on_evict=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.monotonic() > entry[1]:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                record_cache(self.name, False)
+                return default
+            self._data.move_to_end(key)
+        record_cache(self.name, True)
+        return entry[2]
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now, now + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.maxsize:
+                evicted_key, (_, _, evicted_value) = self._data.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+        if self.on_evict:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def fresh_items(self, max_age, prefix=()):
+        now = time.monotonic()
+        prefix = tuple(prefix)
+        with self._lock:
+            return [(key, value) for key, (stored_at, expires_at, value) in self._data.items()
+                    if now - stored_at <= max_age and now <= expires_at
+                    and (not prefix or isinstance(key, tuple) and key[:len(prefix)] == prefix)]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend(CacheBackend):
+    """Cache shared by every process on the host through one SQLite file.
+
+    SQLite's file locking serialises writers across gunicorn workers. Values are pickled, keys
+    are stored as JSON so tuple keys survive the round trip, and recency is tracked in
+    accessed_at so eviction stays LRU like MemoryBackend.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value BLOB NOT NULL,
+        stored_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(namespace, accessed_at);
+    """
+
+    # Eviction needs a COUNT(*), so it only runs every few writes
+    EVICT_EVERY = 32
+    # A hit only rewrites accessed_at once it is older than this fraction of the TTL: reads stay
+    # read-only (no database-wide write lock) and LRU order is kept to that resolution
+    TOUCH_FRACTION = 0.1
+
+    def __init__(self, name, maxsize=256, ttl=60, path=CACHE_PATH):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _encode_key(key):
+        return json.dumps(key, separators=(",", ":"))
+
+    @staticmethod
+    def _decode_key(raw):
+        key = json.loads(raw)
+        return tuple(key) if isinstance(key, list) else key
+
+    def get(self, key, default=None):
+        conn = self._connection()
+        now = time.time()
+        encoded = self._encode_key(key)
+        row = conn.execute(
+            "SELECT value, accessed_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (self.name, encoded, now),
+        ).fetchone()
+        if row is None:
+            record_cache(self.name, False)
+            return default
+        if now - row[1] > self.ttl * self.TOUCH_FRACTION:
+            conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, self.name, encoded)
+            )
+        record_cache(self.name, True)
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self.name,
+                self._encode_key(key),
+                pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                now,
+                now + (self.ttl if ttl is None else ttl),
+                now,
+            ),
+        )
+        with self._writes_lock:
+            self._writes += 1
+            evict = self._writes % self.EVICT_EVERY == 0
+        if evict:
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.name, now))
+        conn.execute(
+            """
+            DELETE FROM cache WHERE namespace = ? AND key IN (
+                SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.name, self.name, self.maxsize),
+        )
+
+    def delete(self, key):
+        self._connection().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.name, self._encode_key(key))
+        )
+
+    def fresh_items(self, max_age, prefix=()):
+        now = time.time()
+        query = "SELECT key, value FROM cache WHERE namespace = ? AND stored_at >= ? AND expires_at > ?"
+        params = [self.name, now - max_age, now]
+        if prefix:
+            # Encoded keys starting with the prefix sort between '["a",' and '["a"-', so the primary
+            # key index finds them and only their values are un-pickled
+            lower = self._encode_key(list(prefix))[:-1] + ","
+            query += " AND key >= ? AND key < ?"
+            params += [lower, lower[:-1] + "-"]
+        rows = self._connection().execute(query, params).fetchall()
+        return [(self._decode_key(key), pickle.loads(value)) for key, value in rows]
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache WHERE namespace = ?", (self.name,))
+
+
+def make_cache(name, maxsize=256, ttl=60, backend=None, **kwargs):
+    backend = backend or CACHE_BACKEND
+    if backend == "sqlite":
+        kwargs.pop("on_evict", None)
+        return SQLiteBackend(name, maxsize=maxsize, ttl=ttl, **kwargs)
+    if backend == "memory":
+        return MemoryBackend(name, maxsize=maxsize, ttl=ttl, **kwargs)
+    raise ValueError(f"Unknown cache backend: {backend}")
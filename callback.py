@@ -1,54 +1,100 @@
 # callbacks.py
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output, State, ALL
+from dash import html
+from dash.dependencies import ClientsideFunction, Input, Output, State, ALL, MATCH
 from dash.exceptions import PreventUpdate
+from flask import Response
 import json
+import time
 import os
-from util import fetch_recent_matches, get_game_info_from_match, save_match_data, deserialize_historical_match, display_recent_matches, get_last_match_data, match_info_to_display
+from util import display_recent_matches, get_last_match_data, match_info_to_display, resolve_match, parse_player_ids, load_match_page, page_label, autosave_review_fields, export_review, scouting_to_display, REVIEW_FIELDS
+from review_archive import import_reviews
+from review_format import decode_review
+from metrics import instrumented_callback
 import base64
-import io
 def register_callbacks(app):
+    callback = instrumented_callback(app)
 
-    @app.callback(
+    @callback(
         [Output("recent-match-info", "children"),
-         Output("recent-match-store", "data")],
-        [Input("recent-match-button", "n_clicks")],
-        [State("player-id-input", "value")],
+         Output("recent-match-store", "data"),
+         Output("match-list-state", "data"),
+         Output("match-page-label", "children")],
+        [Input("recent-match-button", "n_clicks"),
+         Input("saved-match-button", "n_clicks"),
+         Input("prev-page-button", "n_clicks"),
+         Input("next-page-button", "n_clicks"),
+         Input("review-search-input", "value"),
+         Input("match-players-button", "n_clicks")],
+        [State("player-id-input", "value"),
+         State("match-list-state", "data"),
+         State("match-store", "data")],
     )
-    def update_recent_matches(n_clicks, my_profile_id):
-        if not n_clicks:
+    def update_recent_matches(recent_clicks, saved_clicks, prev_clicks, next_clicks, search_query, match_players_clicks, my_profile_id, listing, game_id):
+        ctx = dash.callback_context
+        if not ctx.triggered or not ctx.triggered[0]['value']:
+            raise PreventUpdate
+        trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+
+        if trigger_id == "recent-match-button":
+            listing = {"source": "recent", "player_ids": parse_player_ids(my_profile_id), "page": 0}
+        elif trigger_id == "saved-match-button":
+            listing = {"source": "saved", "page": 0}
+        elif trigger_id == "review-search-input":
+            listing = {"source": "search", "query": search_query.strip(), "page": 0}
+        elif trigger_id == "match-players-button":
+            if game_id is None:
+                raise PreventUpdate
+            listing = {"source": "match", "game_id": game_id, "page": 0}
+        elif listing is None:
             raise PreventUpdate
-        recent_matches = fetch_recent_matches(my_profile_id)
-        game_list = []
-        for match in recent_matches["games"]:
-            game_list.append(match)
-        return display_recent_matches(recent_matches), game_list
+        elif trigger_id == "prev-page-button":
+            if listing["page"] == 0:
+                raise PreventUpdate
+            listing = dict(listing, page=listing["page"] - 1)
+        else:
+            listing = dict(listing, page=listing["page"] + 1)
 
+        page = load_match_page(listing)
+        if trigger_id == "next-page-button" and not page["games"]:
+            raise PreventUpdate
+        # Only game_id handles for the current page go to the browser; matches stay server-side
+        game_list = [match["game_id"] for match in page["games"]]
+        return display_recent_matches(page), game_list, listing, page_label(listing, page["total"])
 
-    @app.callback(
+
+    # Picking a game from the loaded page needs nothing from the server; only the chosen handle goes up
+    app.clientside_callback(
+        ClientsideFunction(namespace="reviewer", function_name="selectGame"),
+        Output("selected-game", "data"),
+        Input({'type': 'game-link', 'index': ALL}, 'n_clicks'),
+        State("recent-match-store", "data"),
+        prevent_initial_call=True
+    )
+
+    @callback(
         [
             Output("my-team-info", "children"),
             Output("opponent-team-info", "children"),
             Output("game-info", "children"),
-            Output("download-button", "style"),
             Output("match-store", "data")
         ],
         [
             Input("fetch-button", "n_clicks"),
             Input("upload-data", "contents"),
-            Input({'type': 'file-link', 'index': ALL}, 'n_clicks'),
-            Input({'type': 'game-link', 'index': ALL}, 'n_clicks')
+            Input("selected-game", "data")
         ],
         [
             State("player-id-input", "value"),
-            State("upload-data", "filename"),
-            State("recent-match-store", "data")
+            State("upload-data", "filename")
         ]
     )
-    def update_match_info(n_clicks, contents, file_link_clicks, game_link_clicks, my_profile_id, filename, recent_matches):
+    def update_match_info(n_clicks, contents, selected_game, my_profile_id, filename):
         ctx = dash.callback_context
         trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+        # With several IDs entered, the first one is the reviewing player
+        player_ids = parse_player_ids(my_profile_id)
+        my_profile_id = player_ids[0] if player_ids else my_profile_id
 
         # Handle match fetching from the input button
         if 'fetch-button' in trigger_id:
@@ -59,24 +105,53 @@ def register_callbacks(app):
         # Handle file uploads
         elif 'upload-data' in trigger_id and contents is not None:
             content_type, content_string = contents.split(',')
-            decoded = base64.b64decode(content_string)
             try:
-                match_data = json.load(io.StringIO(decoded.decode('utf-8')))
+                match_data = decode_review(base64.b64decode(content_string))
                 return match_info_to_display(match_data, my_profile_id)
             except Exception as e:
                 return html.Div(['There was an error processing this file.']), dash.no_update, dash.no_update, dash.no_update
 
-        # Handle recent matches link clicks
-        elif any(element is not None for element in game_link_clicks):
-            trigger_id_dict = json.loads(trigger_id)
-            match = recent_matches[trigger_id_dict["index"]]
+        # Handle a recent/saved match picked in the browser
+        elif 'selected-game' in trigger_id and selected_game:
+            match = resolve_match(selected_game["game_id"])
+            if match is None:
+                raise PreventUpdate
             return match_info_to_display(match, my_profile_id)
 
         else:
             raise PreventUpdate
 
-    @app.callback(
+    # Separate from update_match_info so the team cards never wait on opponents' histories
+    @callback(
+        Output("scouting-info", "children"),
+        Input("match-store", "data"),
+        State("player-id-input", "value")
+    )
+    def update_scouting(game_id, my_profile_id):
+        match = resolve_match(game_id)
+        if match is None:
+            return None
+        player_ids = parse_player_ids(my_profile_id)
+        return scouting_to_display(match, player_ids[0] if player_ids else my_profile_id)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="reviewer", function_name="toggleDownload"),
+        Output("download-button", "style"),
+        Input("match-store", "data")
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="reviewer", function_name="toggleDownload"),
+        Output("match-players-button", "style"),
+        Input("match-store", "data")
+    )
+
+    # Autosave has already stored the review, so the server only hands back the stored match; the
+    # browser lays the fields on screen over it (covering an edit still in flight) and builds the file
+    app.clientside_callback(
+        ClientsideFunction(namespace="reviewer", function_name="downloadReview"),
         Output("download-json", "data"),
+        Input("download-button", "n_clicks"),
         [
             State({"type": "feudal-time", "player_id": ALL}, "id"),
             State({"type": "feudal-time", "player_id": ALL}, "value"),
@@ -87,33 +162,52 @@ def register_callbacks(app):
             State({"type": "empire-dropdown", "player_id": ALL}, "value"),
             State({"type": "strategy-input", "player_id": ALL}, "value"),
             State({"type": "improve-input", "player_id": ALL}, "value"),
-            State("match-store", "data")
+            State("match-store", "data"),
+            State("export-format", "value")
         ],
-        [Input("download-button", "n_clicks")]
+        prevent_initial_call=True
+    )
+
+    @app.server.route("/export/match/<int:game_id>")
+    def export_match(game_id):
+        review = export_review(game_id)
+        if review is None:
+            return Response(status=404)
+        # json.dumps keeps the match's key order, which flask.jsonify would sort
+        return Response(json.dumps(review, ensure_ascii=False), mimetype="application/json", headers={"Cache-Control": "no-store"})
+
+    @callback(
+        Output("bulk-import-status", "children"),
+        [Input("bulk-upload-data", "contents")],
+        [State("bulk-upload-data", "filename")]
     )
-    def download_game_data(ids, feudal_times, feudal_dropdowns, castle_times, castle_dropdowns, empire_times, empire_dropdowns, strategies, improvements, match_data, n_clicks):
-        if n_clicks is None:
+    def bulk_import_reviews(contents, filenames):
+        if not contents:
+            raise PreventUpdate
+        files = (
+            (filename, base64.b64decode(content.split(',', 1)[1]))
+            for filename, content in zip(filenames, contents)
+        )
+        summary = import_reviews(files)
+        message = f"Imported {summary['imported']} of {summary['files']} files ({summary['duplicates']} duplicates"
+        if summary["errors"]:
+            message += f", {len(summary['errors'])} unreadable: {', '.join(sorted(summary['errors']))}"
+        return message + ")."
+
+    def autosave_review(value, game_id):
+        # One callback per field type, so an edit uploads just that player's one field
+        ctx = dash.callback_context
+        if game_id is None or not ctx.triggered:
             raise PreventUpdate
+        field, player_id = ctx.triggered_id["type"], ctx.triggered_id["player_id"]
+        if not autosave_review_fields(game_id, player_id, {field: value}):
+            return "Not saved: match is no longer available."
+        return f"Saved {time.strftime('%H:%M:%S')}"
 
-        match_name = get_game_info_from_match(match_data, True)
-        ids = [entry['player_id'] for entry in ids]
-        player_input = {}
-        for idx, id in enumerate(ids):
-            cur_input = {
-                "feudal-time": feudal_times[idx],
-                "feudal-dropdown": feudal_dropdowns[idx],
-                "castle-time": castle_times[idx],
-                "castle-dropdown": castle_dropdowns[idx],
-                "empire-time": empire_times[idx],
-                "empire-dropdown": empire_dropdowns[idx],
-                "strategy-input": strategies[idx],
-                "improve-input": improvements[idx],
-            }
-            player_input[id] = cur_input
-        match_data["player-input"] = player_input
-
-        json_data = json.dumps(match_data, ensure_ascii=False, indent=4)
-
-        # Return the data as a downloadable JSON file
-        return dcc.send_string(json_data, filename=f"{match_name}.json")
-    
\ No newline at end of file
+    for field in REVIEW_FIELDS:
+        callback(
+            Output({"type": "autosave-status", "player_id": MATCH}, "children", allow_duplicate=True),
+            Input({"type": field, "player_id": MATCH}, "value"),
+            State("match-store", "data"),
+            prevent_initial_call=True
+        )(autosave_review)
@@ -1,3 +1,7 @@
+import os
+import sys
+from types import MappingProxyType
+
 AOE4_LANDMARKS_BY_CIV = {
     "english": {
         "feudal": ["Abbey of Kings", "Council Hall"],
@@ -80,3 +84,87 @@ AOE4_LANDMARKS_BY_CIV = {
         "empire": ["Red Palace", "College of Artillery"]
     }
 }
+
+# Frozen lookup tables derived from AOE4_LANDMARKS_BY_CIV once at import
+
+AGES = ("feudal", "castle", "empire")
+
+# Alternative slugs seen in API payloads and asset filenames -> key in AOE4_LANDMARKS_BY_CIV
+CIV_ALIASES = MappingProxyType({
+    "ayyubid": "ayyubids",
+    "delhi": "delhi_sultanate",
+    "abbasid": "abbasid_dynasty",
+    "hre": "holy_roman_empire",
+    "malian": "malians",
+    "mongol": "mongols",
+    "ottoman": "ottomans",
+    "byzantine": "byzantines",
+    "zhu_xi_legacy": "zhu_xis_legacy",
+    "zhu_xis": "zhu_xis_legacy",
+    "jeanne_d_arc": "jeanne_darc",
+})
+
+# Civs whose image in assets/ isn't named after the civ key
+CIV_ASSET_NAMES = MappingProxyType({
+    "ayyubids": "ayyubid",
+    "delhi_sultanate": "delhi",
+})
+
+LANDMARKS = MappingProxyType({
+    sys.intern(civ): MappingProxyType({
+        age: tuple(sys.intern(landmark) for landmark in ages[age]) for age in AGES
+    })
+    for civ, ages in AOE4_LANDMARKS_BY_CIV.items()
+})
+
+NO_LANDMARKS = MappingProxyType({age: () for age in AGES})
+
+
+def _build_civs_by_landmark():
+    civs_by_landmark = {}
+    for civ, ages in LANDMARKS.items():
+        for landmarks in ages.values():
+            for landmark in landmarks:
+                civs = civs_by_landmark.setdefault(landmark, [])
+                if civ not in civs:
+                    civs.append(civ)
+    return MappingProxyType({landmark: tuple(civs) for landmark, civs in civs_by_landmark.items()})
+
+
+CIVS_BY_LANDMARK = _build_civs_by_landmark()
+
+
+def normalize_civ(slug):
+    if not slug:
+        return None
+    key = str(slug).strip().lower().replace("-", "_").replace(" ", "_").replace("'", "")
+    return CIV_ALIASES.get(key, key)
+
+
+def landmarks_for(civ):
+    # Unknown civs (new DLC, unexpected slugs) get empty option lists instead of a KeyError
+    return LANDMARKS.get(normalize_civ(civ), NO_LANDMARKS)
+
+
+def civ_asset(civ):
+    civ = normalize_civ(civ)
+    if civ not in LANDMARKS:
+        return None
+    return f"./assets/{CIV_ASSET_NAMES.get(civ, civ)}.png"
+
+
+def validate_assets(assets_dir="./assets"):
+    # Returns a list of problems: civs without an image, and images no civ resolves to
+    problems = []
+    asset_stems = {name[:-4] for name in os.listdir(assets_dir) if name.endswith(".png")}
+    for civ in LANDMARKS:
+        stem = CIV_ASSET_NAMES.get(civ, civ)
+        if stem not in asset_stems:
+            problems.append(f"missing asset for {civ}: {stem}.png")
+    for stem in sorted(asset_stems):
+        if normalize_civ(stem) not in LANDMARKS:
+            problems.append(f"asset {stem}.png does not map to a known civ")
+    for alias, civ in CIV_ALIASES.items():
+        if civ not in LANDMARKS:
+            problems.append(f"alias {alias} points to unknown civ {civ}")
+    return problems
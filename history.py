@@ -0,0 +1,142 @@
+# history.py
+import json
+import os
+
+from api_client import HISTORY_PAGE_SIZE, get_client
+from match_store import get_store
+
+HISTORY_DIR = "./data/history"
+
+
+class HistoryPages:
+    """Iterates a player's games newest-first, one page at a time, stopping at the watermark
+    (the newest game already stored locally) so only unseen games are transferred.
+
+    `complete` becomes True once iteration reached the watermark or the end of the history. It stays
+    False when max_pages ran out first, and the watermark must then not advance past the gap.
+    """
+
+    def __init__(self, player_id, watermark=None, page_size=HISTORY_PAGE_SIZE, max_pages=None, client=None):
+        self.player_id = player_id
+        self.watermark = watermark
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.client = client or get_client()
+        self.complete = False
+
+    def __iter__(self):
+        stop_id = self.watermark.get("game_id") if self.watermark else None
+        stop_started_at = self.watermark.get("started_at") if self.watermark else None
+
+        previous_ids = set()
+        page = 1
+        while self.max_pages is None or page <= self.max_pages:
+            data = self.client.get_games_page(self.player_id, page=page, limit=self.page_size)
+            games = data.get("games") or []
+
+            new_games = []
+            reached_watermark = False
+            for game in games:
+                if game["game_id"] == stop_id or (stop_started_at and game["started_at"] <= stop_started_at):
+                    reached_watermark = True
+                    break
+                # New games arriving mid-sync shift earlier entries onto the next page
+                if game["game_id"] not in previous_ids:
+                    new_games.append(game)
+
+            if new_games:
+                yield new_games
+            if reached_watermark or len(games) < self.page_size:
+                self.complete = True
+                return
+            previous_ids = {game["game_id"] for game in games}
+            page += 1
+
+
+def iter_history_pages(player_id, watermark=None, page_size=HISTORY_PAGE_SIZE, max_pages=None, client=None):
+    return HistoryPages(player_id, watermark, page_size, max_pages, client)
+
+
+def _history_paths(player_id, directory):
+    return (
+        os.path.join(directory, f"{player_id}.jsonl"),
+        os.path.join(directory, f"{player_id}.state.json"),
+    )
+
+
+def load_watermark(player_id, directory=HISTORY_DIR):
+    _, state_path = _history_paths(player_id, directory)
+    try:
+        with open(state_path, encoding="utf-8") as state_file:
+            return json.load(state_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_watermark(player_id, watermark, directory=HISTORY_DIR):
+    _, state_path = _history_paths(player_id, directory)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as state_file:
+        json.dump(watermark, state_file)
+    os.replace(tmp_path, state_path)
+
+
+def _written_game_ids(games_path, offset):
+    # game_ids appended to the history file from byte `offset` on
+    game_ids = set()
+    with open(games_path, "rb") as games_file:
+        games_file.seek(offset)
+        for line in games_file:
+            if line.strip():
+                game_ids.add(json.loads(line)["game_id"])
+    return game_ids
+
+
+def sync_history(player_id, directory=HISTORY_DIR, page_size=HISTORY_PAGE_SIZE, max_pages=None, client=None):
+    # Appends every game newer than the stored watermark to <player_id>.jsonl as pages arrive.
+    # The watermark only advances once the sync reaches it (or the end of the history), so an
+    # interrupted or page-limited run leaves no gap. Such a run records where its games start in the
+    # file (pending_offset); the next run fetches them again and skips the ones already written.
+    os.makedirs(directory, exist_ok=True)
+    games_path, _ = _history_paths(player_id, directory)
+    watermark = load_watermark(player_id, directory) or {}
+    pending_offset = watermark.get("pending_offset")
+    if pending_offset is None:
+        pending_offset = os.path.getsize(games_path) if os.path.exists(games_path) else 0
+        written = set()
+    else:
+        written = _written_game_ids(games_path, pending_offset)
+
+    newest = None
+    count = 0
+    pages = iter_history_pages(player_id, watermark, page_size, max_pages, client)
+    with open(games_path, "a", encoding="utf-8") as games_file:
+        for games in pages:
+            if newest is None:
+                newest = games[0]
+            for game in games:
+                if game["game_id"] in written:
+                    continue
+                games_file.write(json.dumps(game, ensure_ascii=False, separators=(",", ":")))
+                games_file.write("\n")
+                count += 1
+            games_file.flush()
+
+    if pages.complete:
+        if newest is not None:
+            save_watermark(player_id, {"game_id": newest["game_id"], "started_at": newest["started_at"]}, directory)
+    elif count and "pending_offset" not in watermark:
+        save_watermark(player_id, dict(watermark, pending_offset=pending_offset), directory)
+    return count
+
+
+def sync_history_to_store(player_id, store=None, page_size=HISTORY_PAGE_SIZE, max_pages=None, client=None):
+    # Same as sync_history, but the match store keeps the watermark (see MatchStore.begin_history_sync)
+    store = store or get_store()
+    count = 0
+    pages = iter_history_pages(player_id, store.begin_history_sync(player_id), page_size, max_pages, client)
+    for games in pages:
+        count += store.save_matches((game, None) for game in games)
+    if pages.complete:
+        store.finish_history_sync(player_id)
+    return count
@@ -0,0 +1,183 @@
+# ingest.py
+# Syncs the match histories of every player in a roster file into the local match store,
+# without the web app. Pages are fetched on a thread pool behind the client's global rate limit
+# and flattened into store rows on a process pool. An interrupted run picks up where it stopped.
+#
+#   python ingest.py roster.txt [--threads 4] [--processes 2] [--max-pages N]
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from api_client import HISTORY_PAGE_SIZE, RATE_LIMIT, Aoe4WorldClient, set_client
+from history import iter_history_pages
+from match_store import STORE_PATH, MatchStore, normalize_match
+from process_pool import make_process_pool
+
+CHECKPOINT_PATH = "./data/ingest_checkpoint.json"
+NORMALIZE_CHUNKSIZE = 16
+
+
+def read_roster(path):
+    # One or more profile IDs per line, separated by commas or spaces; '#' starts a comment
+    player_ids = []
+    with open(path, encoding="utf-8") as roster_file:
+        for line in roster_file:
+            for player_id in line.split("#", 1)[0].replace(",", " ").split():
+                if player_id not in player_ids:
+                    player_ids.append(player_id)
+    return player_ids
+
+
+class Checkpoint:
+    """Which roster players this run has finished, rewritten atomically after every change.
+
+    A rerun skips them; the file is removed once the whole roster has synced. Where each player's
+    sync resumes from is kept by the store (MatchStore.begin_history_sync), so players cut short by
+    an error or --max-pages are re-fetched down to their old boundary rather than leaving a gap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as checkpoint_file:
+                self.players = json.load(checkpoint_file)
+        except FileNotFoundError:
+            self.players = {}
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(self.players, checkpoint_file)
+        os.replace(tmp_path, self.path)
+
+    def done(self, player_id):
+        return self.players.get(player_id, {}).get("done", False)
+
+    def finish(self, player_id):
+        with self._lock:
+            self.players[player_id] = {"done": True}
+            self._save()
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class IngestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.games = 0
+        self.pages = 0
+        self.bytes = 0
+        self.retries = 0
+        self.failed_players = []
+        self._lock = threading.Lock()
+
+    def on_response(self, response, *args, **kwargs):
+        # requests response hook: sees the final response of every upstream call, retries included
+        retries = getattr(response.raw, "retries", None)
+        with self._lock:
+            self.bytes += len(response.content)
+            self.retries += len(retries.history) if retries is not None else 0
+        return response
+
+    def add_page(self, games):
+        with self._lock:
+            self.pages += 1
+            self.games += games
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return (
+            f"{self.games} games from {self.pages} pages in {elapsed:.1f} s "
+            f"({self.games / elapsed if elapsed else 0:.1f} games/s), "
+            f"{self.bytes / 1e6:.2f} MB downloaded, {self.retries} retries"
+        )
+
+
+def ingest_player(player_id, store, checkpoint, stats, normalize, page_size, max_pages, client):
+    count = 0
+    pages = iter_history_pages(player_id, store.begin_history_sync(player_id), page_size, max_pages, client)
+    for games in pages:
+        count += store.save_normalized(normalize(games))
+        stats.add_page(len(games))
+    if pages.complete:
+        store.finish_history_sync(player_id)
+    # A --max-pages cut is done for this run; the store keeps its boundary for the next one
+    checkpoint.finish(player_id)
+    return count
+
+
+def ingest(player_ids, store, checkpoint, threads=4, processes=None, page_size=HISTORY_PAGE_SIZE,
+           max_pages=None, client=None, stats=None, progress=print):
+    client = client or Aoe4WorldClient(rate_limit=RATE_LIMIT)
+    stats = stats or IngestStats()
+    client.session.hooks["response"].append(stats.on_response)
+    pending = [player_id for player_id in player_ids if not checkpoint.done(player_id)]
+    if len(pending) < len(player_ids):
+        progress(f"Resuming: {len(player_ids) - len(pending)} of {len(player_ids)} players already synced")
+
+    pool = make_process_pool(processes) if processes != 0 else None
+    if pool is not None:
+        def normalize(games):
+            return pool.map(normalize_match, games, chunksize=NORMALIZE_CHUNKSIZE)
+    else:
+        def normalize(games):
+            return map(normalize_match, games)
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = {
+                executor.submit(
+                    ingest_player, player_id, store, checkpoint, stats, normalize, page_size, max_pages, client
+                ): player_id
+                for player_id in pending
+            }
+            for future in as_completed(futures):
+                player_id = futures[future]
+                try:
+                    progress(f"{player_id}: {future.result()} games. {stats.summary()}")
+                except requests.exceptions.RequestException as e:
+                    stats.failed_players.append(player_id)
+                    progress(f"{player_id}: failed ({e}); rerun to resume")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if not stats.failed_players:
+        checkpoint.clear()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync every roster player's match history into the match store")
+    parser.add_argument("roster", help="file of aoe4world profile IDs")
+    parser.add_argument("--db", default=STORE_PATH)
+    parser.add_argument("--threads", type=int, default=4, help="players fetched concurrently")
+    parser.add_argument("--processes", type=int, help="normalizer processes (default: CPU count, 0 = inline)")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT, help="upstream requests per second, shared by all threads")
+    parser.add_argument("--page-size", type=int, default=HISTORY_PAGE_SIZE)
+    parser.add_argument("--max-pages", type=int, help="per player, for a bounded first sync")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    args = parser.parse_args()
+
+    client = Aoe4WorldClient(rate_limit=args.rate_limit, pool_size=max(args.threads, 1))
+    set_client(client)
+    stats = ingest(
+        read_roster(args.roster), MatchStore(args.db), Checkpoint(args.checkpoint), args.threads,
+        args.processes, args.page_size, args.max_pages, client,
+    )
+    print(stats.summary())
+    if stats.failed_players:
+        print(f"Failed: {', '.join(stats.failed_players)}; progress saved to {args.checkpoint}")
+        raise SystemExit(1)
@@ -0,0 +1,251 @@
+# match_archive.py
+# Columnar archive for large match histories: a games table and a (game, player) table, stored as
+# Parquet and partitioned by month. Reads memory-map the files and push column projection and
+# started_at/map/civ filters down to Parquet, so a query only touches the row groups it needs.
+#
+#   python match_archive.py build [--history-dir ./data/history]
+#   python match_archive.py query --profile 1001 --map "Dry Arabia" --since 2024-09-01
+import argparse
+import glob
+import json
+import os
+from collections import defaultdict
+
+import constants
+from match_store import _players, get_store
+from timestamps import parse_utc
+
+ARCHIVE_DIR = os.environ.get("AOE4_ARCHIVE_DIR", "./data/archive")
+TABLES = ("games", "players")
+# Matches are flattened and merged into their month's files this many at a time
+WRITE_BATCH_SIZE = 50000
+ROW_GROUP_SIZE = 64 * 1024
+
+
+def _pyarrow():
+    # pyarrow is only needed by the archive; the web app never imports it
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.fs
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("The match archive requires pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _schemas(pa):
+    started_at = pa.timestamp("ms", tz="UTC")
+    games = pa.schema([
+        ("game_id", pa.int64()),
+        ("started_at", started_at),
+        ("duration", pa.int32()),
+        ("map", pa.string()),
+        ("kind", pa.string()),
+        ("leaderboard", pa.string()),
+        ("season", pa.int16()),
+        ("patch", pa.int32()),
+        ("server", pa.string()),
+        ("average_mmr", pa.float64()),
+    ])
+    # map, kind and patch are repeated per player so player queries never need a join
+    players = pa.schema([
+        ("game_id", pa.int64()),
+        ("started_at", started_at),
+        ("map", pa.string()),
+        ("kind", pa.string()),
+        ("patch", pa.int32()),
+        ("profile_id", pa.int64()),
+        ("name", pa.string()),
+        ("civilization", pa.string()),
+        ("team", pa.int8()),
+        ("result", pa.string()),
+        ("mmr", pa.int32()),
+    ])
+    return {"games": games, "players": players}
+
+
+def _flatten(matches):
+    # matches: one month's games, already deduplicated by game_id
+    games = defaultdict(list)
+    players = defaultdict(list)
+    for match in matches:
+        started_at = parse_utc(match["started_at"])
+        game_row = {
+            "game_id": match["game_id"],
+            "started_at": started_at,
+            "duration": match.get("duration"),
+            "map": match.get("map"),
+            "kind": match.get("kind"),
+            "leaderboard": match.get("leaderboard"),
+            "season": match.get("season"),
+            "patch": match.get("patch"),
+            "server": match.get("server"),
+            "average_mmr": match.get("average_mmr"),
+        }
+        for column, value in game_row.items():
+            games[column].append(value)
+        for game_id, profile_id, name, civilization, team, result, mmr in _players(match):
+            for column, value in (
+                ("game_id", game_id), ("started_at", started_at), ("map", game_row["map"]),
+                ("kind", game_row["kind"]), ("patch", game_row["patch"]), ("profile_id", profile_id),
+                ("name", name), ("civilization", constants.normalize_civ(civilization)),
+                ("team", team), ("result", result), ("mmr", mmr),
+            ):
+                players[column].append(value)
+    return {"games": games, "players": players}
+
+
+def _partition_dir(root, table, month):
+    return os.path.join(root, table, f"month={month}")
+
+
+def _write_month(pa, root, month, matches, schemas):
+    columns = _flatten(matches)
+    new_ids = pa.array([match["game_id"] for match in matches], pa.int64())
+    for table_name in TABLES:
+        table = pa.Table.from_pydict(columns[table_name], schema=schemas[table_name])
+        directory = _partition_dir(root, table_name, month)
+        path = os.path.join(directory, "part-0.parquet")
+        if os.path.exists(path):
+            # Rewrite the month with the new rows replacing any earlier copy of the same games
+            existing = pa.parquet.read_table(path, memory_map=True, schema=schemas[table_name])
+            keep = pa.compute.invert(pa.compute.is_in(existing["game_id"], value_set=new_ids))
+            table = pa.concat_tables([existing.filter(keep), table])
+        # Sorted rows give each row group a narrow started_at range for the Parquet statistics to prune
+        table = table.sort_by([("started_at", "ascending"), ("game_id", "ascending")])
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        pa.parquet.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+        os.replace(tmp_path, path)
+
+
+def write_archive(matches, root=ARCHIVE_DIR, batch_size=WRITE_BATCH_SIZE):
+    # matches: any iterable of aoe4world game dicts (store rows, history .jsonl, API pages).
+    # Writing the same game again replaces it, so rebuilding or re-feeding overlapping sources is safe.
+    pa = _pyarrow()
+    schemas = _schemas(pa)
+    written = 0
+    batch = {}
+
+    def flush():
+        by_month = defaultdict(list)
+        for match in batch.values():
+            by_month[match["started_at"][:7]].append(match)
+        for month, month_matches in by_month.items():
+            _write_month(pa, root, month, month_matches, schemas)
+        batch.clear()
+
+    for match in matches:
+        if match["game_id"] not in batch:
+            written += 1
+        batch[match["game_id"]] = match
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return written
+
+
+def iter_history_files(directory):
+    # Games saved by history.sync_history, one JSON object per line
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(path, encoding="utf-8") as games_file:
+            for line in games_file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def open_dataset(table="players", root=ARCHIVE_DIR):
+    pa = _pyarrow()
+    return pa.dataset.dataset(
+        os.path.join(root, table),
+        schema=_schemas(pa)[table].append(pa.field("month", pa.string())),
+        format="parquet",
+        partitioning=pa.dataset.partitioning(pa.schema([("month", pa.string())]), flavor="hive"),
+        filesystem=pa.fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def _as_datetime(value):
+    # Accepts datetimes, full aoe4world timestamps or plain dates (taken as UTC midnight)
+    if not isinstance(value, str):
+        return value
+    return parse_utc(value if "T" in value else f"{value}T00:00:00Z")
+
+
+def query(table="players", columns=None, map_name=None, kind=None, civ=None, profile_id=None,
+          patch=None, started_after=None, started_before=None, root=ARCHIVE_DIR):
+    # Returns a pyarrow Table; only the requested columns and matching row groups are read
+    pa = _pyarrow()
+    field = pa.dataset.field
+    conditions = []
+    if map_name:
+        conditions.append(field("map") == map_name)
+    if kind:
+        conditions.append(field("kind") == kind)
+    if patch is not None:
+        conditions.append(field("patch") == int(patch))
+    if started_after is not None:
+        started_after = _as_datetime(started_after)
+        conditions.append(field("month") >= started_after.strftime("%Y-%m"))
+        conditions.append(field("started_at") >= started_after)
+    if started_before is not None:
+        started_before = _as_datetime(started_before)
+        conditions.append(field("month") <= started_before.strftime("%Y-%m"))
+        conditions.append(field("started_at") < started_before)
+
+    if civ or profile_id is not None:
+        player_conditions = []
+        if civ:
+            player_conditions.append(field("civilization") == constants.normalize_civ(civ))
+        if profile_id is not None:
+            player_conditions.append(field("profile_id") == int(profile_id))
+        if table == "players":
+            conditions.extend(player_conditions)
+        else:
+            # The games table has no player columns: select the game ids from the players table first
+            game_ids = query(
+                "players", ["game_id"], map_name, kind, civ, profile_id, patch, started_after, started_before, root
+            )["game_id"]
+            conditions.append(field("game_id").isin(pa.compute.unique(game_ids)))
+
+    if not os.path.isdir(os.path.join(root, table)):
+        schema = _schemas(pa)[table]
+        return schema.empty_table().select(columns or schema.names)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return open_dataset(table, root).to_table(columns=columns, filter=expression)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the columnar match archive")
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="archive every match in the store (and optional history files)")
+    build_parser.add_argument("--history-dir", help="also archive the .jsonl files written by history.sync_history")
+    query_parser = subparsers.add_parser("query")
+    query_parser.add_argument("--table", choices=TABLES, default="players")
+    query_parser.add_argument("--columns", help="comma-separated column names")
+    query_parser.add_argument("--map")
+    query_parser.add_argument("--kind")
+    query_parser.add_argument("--civ")
+    query_parser.add_argument("--profile")
+    query_parser.add_argument("--patch")
+    query_parser.add_argument("--since", help="ISO date or timestamp (UTC)")
+    query_parser.add_argument("--until", help="ISO date or timestamp (UTC)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        written = write_archive(get_store().iter_matches(), args.root)
+        if args.history_dir:
+            written += write_archive(iter_history_files(args.history_dir), args.root)
+        print(f"Archived {written} matches into {args.root}")
+    else:
+        result = query(
+            args.table, args.columns.split(",") if args.columns else None, args.map, args.kind, args.civ,
+            args.profile, args.patch, args.since, args.until, args.root,
+        )
+        print(result.to_pandas().to_string(max_rows=50))
+        print(f"{result.num_rows} rows")
@@ -0,0 +1,101 @@
+# match_cache.py
+import json
+import os
+import threading
+
+from cache_backend import make_cache
+from metrics import record_cache
+
+SPILL_DIR = os.environ.get("AOE4_MATCH_CACHE_DIR")
+# Finished matches never change; the TTL only bounds how long a shared cache keeps them
+MATCH_TTL = 7 * 24 * 3600
+
+
+class MatchCache:
+    """Keeps recently used matches server-side so dcc.Store only needs to hold game_id handles.
+
+    Matches live in a cache backend (per-process memory or the shared SQLite cache). With the
+    memory backend, entries evicted from the LRU are written to `spill_dir` (when configured)
+    and loaded back on the next lookup.
+    """
+
+    def __init__(self, maxsize=512, spill_dir=SPILL_DIR, backend=None):
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._cache = make_cache(
+            "match", maxsize=maxsize, ttl=MATCH_TTL, backend=backend,
+            on_evict=self._spill if spill_dir else None,
+        )
+
+    def _spill_path(self, game_id):
+        return os.path.join(self.spill_dir, f"{int(game_id)}.json")
+
+    def _spill(self, game_id, match):
+        with open(self._spill_path(game_id), "w", encoding="utf-8") as spill_file:
+            json.dump(match, spill_file, ensure_ascii=False, separators=(",", ":"))
+
+    def put(self, match):
+        game_id = int(match["game_id"])
+        self._cache.set(game_id, match)
+        return game_id
+
+    def add(self, matches, store):
+        # Caches matches and writes the ones not cached yet through to `store`, so their handles
+        # resolve in every worker. Copies from aoe4world carry no review: they never replace a cached
+        # entry and pick up the review the store holds. A match with its own review (an uploaded
+        # file) replaces the cached copy.
+        uncached = {}
+        for match in matches:
+            game_id = int(match["game_id"])
+            if self.get(game_id) is None:
+                uncached[game_id] = match
+            elif match.get("player-input") is not None:
+                self.put(match)
+        if uncached:
+            store.save_matches((match, None) for match in uncached.values())
+            reviews = store.get_player_inputs(uncached)
+            for game_id, match in uncached.items():
+                if match.get("player-input") is None and game_id in reviews:
+                    match = dict(match, **{"player-input": reviews[game_id]})
+                self.put(match)
+        return [int(match["game_id"]) for match in matches]
+
+    def get(self, game_id):
+        game_id = int(game_id)
+        match = self._cache.get(game_id)
+        if match is not None or not self.spill_dir:
+            return match
+        try:
+            with open(self._spill_path(game_id), encoding="utf-8") as spill_file:
+                match = json.load(spill_file)
+        except FileNotFoundError:
+            record_cache("match_spill", False)
+            return None
+        record_cache("match_spill", True)
+        self.put(match)
+        return match
+
+    def delete(self, game_id):
+        self._cache.delete(int(game_id))
+        if self.spill_dir:
+            try:
+                os.remove(self._spill_path(game_id))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        self._cache.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_match_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = MatchCache()
+    return _cache
@@ -0,0 +1,494 @@
+# match_store.py
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STORE_PATH = os.environ.get("AOE4_STORE_PATH", "./data/matches.sqlite3")
+
+SCHEMA = """
+-- review_updated_at only changes with player_input, so derived review caches ignore re-saved API copies
+CREATE TABLE IF NOT EXISTS matches (
+    game_id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    duration INTEGER,
+    map TEXT,
+    kind TEXT,
+    average_mmr INTEGER,
+    civs TEXT,
+    profile_ids TEXT,
+    match_json TEXT NOT NULL,
+    player_input TEXT,
+    updated_at REAL NOT NULL,
+    review_updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_matches_started_at ON matches(started_at);
+CREATE INDEX IF NOT EXISTS idx_matches_map ON matches(map, started_at);
+CREATE INDEX IF NOT EXISTS idx_matches_kind ON matches(kind, started_at);
+CREATE INDEX IF NOT EXISTS idx_matches_mmr ON matches(average_mmr);
+
+CREATE TABLE IF NOT EXISTS match_players (
+    game_id INTEGER NOT NULL,
+    profile_id INTEGER NOT NULL,
+    name TEXT,
+    civilization TEXT,
+    team INTEGER,
+    result TEXT,
+    mmr INTEGER,
+    PRIMARY KEY (game_id, profile_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_players_profile ON match_players(profile_id, game_id);
+CREATE INDEX IF NOT EXISTS idx_players_civ ON match_players(civilization, game_id);
+
+-- Boundary of a history sync that hasn't caught up yet; game_id is NULL when it started from an empty store
+CREATE TABLE IF NOT EXISTS history_syncs (
+    profile_id INTEGER PRIMARY KEY,
+    game_id INTEGER,
+    started_at TEXT
+);
+"""
+
+# Full-text index over review notes plus the map, civ and landmark names they refer to; rowid is the game_id
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE review_search USING fts5(
+    notes, map, civs, landmarks,
+    tokenize = 'porter unicode61'
+);
+"""
+
+REVIEW_NOTE_FIELDS = ("strategy-input", "improve-input")
+REVIEW_LANDMARK_FIELDS = ("feudal-dropdown", "castle-dropdown", "empire-dropdown")
+
+SUMMARY_COLUMNS = "m.game_id, m.started_at, m.duration, m.map, m.kind, m.average_mmr, m.civs, m.profile_ids, m.player_input IS NOT NULL"
+SORT_COLUMNS = {"started_at": "m.started_at", "average_mmr": "m.average_mmr", "duration": "m.duration", "map": "m.map"}
+
+
+def _summary(row):
+    return {
+        "game_id": row[0],
+        "started_at": row[1],
+        "duration": row[2],
+        "map": row[3],
+        "kind": row[4],
+        "average_mmr": row[5],
+        "civs": row[6].split(",") if row[6] else [],
+        "profile_ids": row[7].split(",") if row[7] else [],
+        "reviewed": bool(row[8]),
+    }
+
+
+def _compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _search_document(match, players, player_input):
+    notes, landmarks = [], []
+    for review in player_input.values():
+        if not review:
+            continue
+        notes.extend(review[field] for field in REVIEW_NOTE_FIELDS if review.get(field))
+        landmarks.extend(review[field] for field in REVIEW_LANDMARK_FIELDS if review.get(field))
+    civs = {str(player[3]).replace("_", " ") for player in players if player[3]}
+    return (
+        match["game_id"],
+        "\n".join(notes),
+        match.get("map") or "",
+        " ".join(sorted(civs)),
+        " ".join(landmarks),
+    )
+
+
+def normalize_match(match, player_input=None):
+    # Flattens a match into its matches row (minus updated_at), match_players rows and search document
+    match = dict(match)
+    embedded_input = match.pop("player-input", None)
+    if player_input is None:
+        player_input = embedded_input
+    players = list(_players(match))
+    match_row = (
+        match["game_id"],
+        match["started_at"],
+        match.get("duration"),
+        match.get("map"),
+        match.get("kind"),
+        match.get("average_mmr"),
+        ",".join(sorted({str(p[3]) for p in players})),
+        ",".join(str(p[1]) for p in players),
+        _compact(match),
+        _compact(player_input) if player_input is not None else None,
+    )
+    document = _search_document(match, players, player_input) if player_input is not None else None
+    return match_row, players, document
+
+
+def _match_query(text):
+    # Every word must match, as a prefix, so "tower rush eng" finds "towers", "rushing", "english"
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " AND ".join(f'"{term}"*' for term in terms if term)
+
+
+def _players(match):
+    for team_index, team in enumerate(match.get("teams", [])):
+        for player_data in team:
+            player = player_data["player"]
+            yield (
+                match["game_id"],
+                player["profile_id"],
+                player.get("name"),
+                player.get("civilization"),
+                team_index,
+                player.get("result"),
+                player.get("mmr"),
+            )
+
+
+class MatchStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            self._add_review_updated_at(conn)
+            self.search_enabled = self._create_search_index(conn)
+
+    def _add_review_updated_at(self, conn):
+        # Stores created before the column existed take each review's updated_at as its starting value
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(matches)")}
+        if "review_updated_at" not in columns:
+            conn.execute("ALTER TABLE matches ADD COLUMN review_updated_at REAL")
+            conn.execute("UPDATE matches SET review_updated_at = updated_at WHERE player_input IS NOT NULL")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_review_updated ON matches(review_updated_at)")
+
+    def _create_search_index(self, conn):
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'review_search'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            conn.executescript(SEARCH_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; search_reviews falls back to LIKE over the notes
+            return False
+        self.rebuild_search_index(conn)
+        return True
+
+    def rebuild_search_index(self, conn=None):
+        conn = conn or self.connection()
+        conn.execute("DELETE FROM review_search")
+        for match in self.iter_matches(reviewed_only=True):
+            conn.execute(
+                "INSERT INTO review_search (rowid, notes, map, civs, landmarks) VALUES (?, ?, ?, ?, ?)",
+                _search_document(match, list(_players(match)), match["player-input"]),
+            )
+
+    def connection(self):
+        # sqlite3 connections can't be shared across threads, and Dash runs callbacks on a thread pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save_match(self, match, player_input=None):
+        self.save_matches([(match, player_input)])
+        return match["game_id"]
+
+    def save_matches(self, entries):
+        # entries: iterable of (match, player_input); player_input=None keeps any existing review
+        return self.save_normalized(normalize_match(match, player_input) for match, player_input in entries)
+
+    def save_normalized(self, rows):
+        # rows: output of normalize_match, which may have been produced in other processes
+        now = time.time()
+        conn = self.connection()
+        count = 0
+        with conn:
+            for match_row, players, document in rows:
+                conn.execute(
+                    """
+                    INSERT INTO matches (game_id, started_at, duration, map, kind, average_mmr, civs, profile_ids,
+                                         match_json, player_input, updated_at, review_updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(game_id) DO UPDATE SET
+                        started_at=excluded.started_at, duration=excluded.duration, map=excluded.map,
+                        kind=excluded.kind, average_mmr=excluded.average_mmr, civs=excluded.civs,
+                        profile_ids=excluded.profile_ids, match_json=excluded.match_json,
+                        player_input=COALESCE(excluded.player_input, matches.player_input),
+                        updated_at=excluded.updated_at,
+                        review_updated_at=CASE
+                            WHEN excluded.player_input IS NULL OR excluded.player_input IS matches.player_input
+                            THEN matches.review_updated_at ELSE excluded.review_updated_at END
+                    """,
+                    (*match_row, now, now if match_row[9] is not None else None),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO match_players VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    players,
+                )
+                if document is not None and self.search_enabled:
+                    self._index_review(conn, document)
+                count += 1
+        return count
+
+    def _index_review(self, conn, document):
+        conn.execute("DELETE FROM review_search WHERE rowid = ?", (document[0],))
+        conn.execute(
+            "INSERT INTO review_search (rowid, notes, map, civs, landmarks) VALUES (?, ?, ?, ?, ?)",
+            document,
+        )
+
+    def search_reviews(self, text, offset=0, limit=50):
+        # Returns (summaries, total) for reviews matching every word in `text`, best match first
+        if not text or not text.split():
+            return [], 0
+        conn = self.connection()
+        if self.search_enabled:
+            query = _match_query(text)
+            total = conn.execute(
+                "SELECT COUNT(*) FROM review_search WHERE review_search MATCH ?", (query,)
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT {SUMMARY_COLUMNS} FROM review_search s
+                JOIN matches m ON m.game_id = s.rowid
+                WHERE review_search MATCH ?
+                ORDER BY bm25(review_search), m.started_at DESC
+                LIMIT ? OFFSET ?
+                """,
+                (query, limit, offset),
+            ).fetchall()
+        else:
+            clauses = " AND ".join(
+                "(m.player_input LIKE ? OR m.map LIKE ? OR m.civs LIKE ?)" for _ in text.split()
+            )
+            params = [f"%{term}%" for term in text.split() for _ in range(3)]
+            where = f" WHERE m.player_input IS NOT NULL AND {clauses}"
+            total = conn.execute(f"SELECT COUNT(*) FROM matches m{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM matches m{where} ORDER BY m.started_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [_summary(row) for row in rows], total
+
+    def update_review_fields(self, game_id, profile_id, changes):
+        # Merges {field: value} into one player's review with json_patch instead of rewriting the
+        # row; returns False when the match isn't stored yet. A None value removes the field.
+        patch = _compact({str(profile_id): changes})
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            updated = conn.execute(
+                "UPDATE matches SET player_input = json_patch(COALESCE(player_input, '{}'), ?), updated_at = ?, "
+                "review_updated_at = ? WHERE game_id = ?",
+                (patch, now, now, game_id),
+            ).rowcount
+            if updated and self.search_enabled and any(
+                field in REVIEW_NOTE_FIELDS or field in REVIEW_LANDMARK_FIELDS for field in changes
+            ):
+                self._reindex_review(conn, game_id)
+        return bool(updated)
+
+    def _reindex_review(self, conn, game_id):
+        # Rebuilds one search document from the indexed columns, without parsing match_json
+        game_id, map_name, civs, player_input = conn.execute(
+            "SELECT game_id, map, civs, player_input FROM matches WHERE game_id = ?", (game_id,)
+        ).fetchone()
+        players = [(game_id, None, None, civ) for civ in (civs.split(",") if civs else [])]
+        self._index_review(conn, _search_document({"game_id": game_id, "map": map_name}, players, json.loads(player_input)))
+
+    def get_match(self, game_id):
+        row = self.connection().execute(
+            "SELECT match_json, player_input FROM matches WHERE game_id = ?", (game_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        match = json.loads(row[0])
+        if row[1] is not None:
+            match["player-input"] = json.loads(row[1])
+        return match
+
+    def get_player_inputs(self, game_ids, batch_size=500):
+        # {game_id: player_input} for the given games that have a review
+        game_ids = list(game_ids)
+        reviews = {}
+        for start in range(0, len(game_ids), batch_size):
+            batch = game_ids[start:start + batch_size]
+            rows = self.connection().execute(
+                f"SELECT game_id, player_input FROM matches WHERE player_input IS NOT NULL "
+                f"AND game_id IN ({', '.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            reviews.update((game_id, json.loads(player_input)) for game_id, player_input in rows)
+        return reviews
+
+    def iter_matches(self, reviewed_only=False, batch_size=200):
+        # Keyset pagination on game_id keeps only one batch of full matches in memory
+        where = " AND player_input IS NOT NULL" if reviewed_only else ""
+        last_id = -1
+        while True:
+            rows = self.connection().execute(
+                f"SELECT game_id, match_json, player_input FROM matches WHERE game_id > ?{where} "
+                "ORDER BY game_id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for game_id, match_json, player_input in rows:
+                match = json.loads(match_json)
+                if player_input is not None:
+                    match["player-input"] = json.loads(player_input)
+                yield match
+            last_id = rows[-1][0]
+
+    def _where(self, map_name=None, kind=None, civ=None, profile_id=None, reviewed_only=False,
+               started_after=None, started_before=None):
+        clauses, params = [], []
+        if map_name:
+            clauses.append("m.map = ?")
+            params.append(map_name)
+        if kind:
+            clauses.append("m.kind = ?")
+            params.append(kind)
+        if started_after:
+            clauses.append("m.started_at >= ?")
+            params.append(started_after)
+        if started_before:
+            clauses.append("m.started_at < ?")
+            params.append(started_before)
+        if reviewed_only:
+            clauses.append("m.player_input IS NOT NULL")
+        if civ or profile_id is not None:
+            sub, sub_params = [], []
+            if civ:
+                sub.append("p.civilization = ?")
+                sub_params.append(civ)
+            if profile_id is not None:
+                sub.append("p.profile_id = ?")
+                sub_params.append(int(profile_id))
+            clauses.append(
+                "m.game_id IN (SELECT p.game_id FROM match_players p WHERE " + " AND ".join(sub) + ")"
+            )
+            params.extend(sub_params)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def list_matches(self, offset=0, limit=50, sort="started_at", descending=True, **filters):
+        where, params = self._where(**filters)
+        order = SORT_COLUMNS.get(sort, "m.started_at")
+        direction = "DESC" if descending else "ASC"
+        rows = self.connection().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM matches m{where} "
+            f"ORDER BY {order} {direction}, m.game_id {direction} LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return [_summary(row) for row in rows]
+
+    def count_matches(self, **filters):
+        where, params = self._where(**filters)
+        return self.connection().execute(f"SELECT COUNT(*) FROM matches m{where}", params).fetchone()[0]
+
+    def fingerprint(self):
+        # Changes whenever a review is added or edited, not when matches are re-saved from aoe4world;
+        # used to invalidate caches derived from the reviews
+        return self.connection().execute(
+            "SELECT COUNT(*), MAX(review_updated_at) FROM matches WHERE review_updated_at IS NOT NULL"
+        ).fetchone()
+
+    def newest_game(self, profile_id):
+        row = self.connection().execute(
+            """
+            SELECT m.game_id, m.started_at FROM matches m
+            JOIN match_players p ON p.game_id = m.game_id
+            WHERE p.profile_id = ? ORDER BY m.started_at DESC LIMIT 1
+            """,
+            (int(profile_id),),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"game_id": row[0], "started_at": row[1]}
+
+    def begin_history_sync(self, profile_id):
+        # Pages arrive newest-first, so after a partial sync the newest stored game is past a gap.
+        # The boundary of the first unfinished sync is kept and reused until one catches up.
+        conn = self.connection()
+        with conn:
+            watermark = self.newest_game(profile_id) or {}
+            conn.execute(
+                "INSERT OR IGNORE INTO history_syncs VALUES (?, ?, ?)",
+                (int(profile_id), watermark.get("game_id"), watermark.get("started_at")),
+            )
+            row = conn.execute(
+                "SELECT game_id, started_at FROM history_syncs WHERE profile_id = ?", (int(profile_id),)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return {"game_id": row[0], "started_at": row[1]}
+
+    def finish_history_sync(self, profile_id):
+        with self.connection() as conn:
+            conn.execute("DELETE FROM history_syncs WHERE profile_id = ?", (int(profile_id),))
+
+    def review_landmarks(self, profile_id):
+        # {review field: {landmark: times chosen}} across every saved review of this player
+        paths = [f'$."{int(profile_id)}"."{field}"' for field in REVIEW_LANDMARK_FIELDS]
+        rows = self.connection().execute(
+            f"""
+            SELECT {", ".join("json_extract(m.player_input, ?)" for _ in paths)} FROM matches m
+            JOIN match_players p ON p.game_id = m.game_id
+            WHERE p.profile_id = ? AND m.player_input IS NOT NULL
+            """,
+            (*paths, int(profile_id)),
+        ).fetchall()
+        counts = {field: {} for field in REVIEW_LANDMARK_FIELDS}
+        for row in rows:
+            for field, landmark in zip(REVIEW_LANDMARK_FIELDS, row):
+                if landmark:
+                    counts[field][landmark] = counts[field].get(landmark, 0) + 1
+        return counts
+
+    def import_json_dir(self, directory="./data"):
+        # One-time migration of the old one-file-per-match layout
+        def entries():
+            for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+                with open(path, encoding="utf-8") as json_file:
+                    match = json.load(json_file)
+                if "game_id" in match:
+                    yield match, None
+
+        return self.save_matches(entries())
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MatchStore()
+    return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import saved ./data/*.json reviews into the match store")
+    parser.add_argument("directory", nargs="?", default="./data")
+    parser.add_argument("--db", default=STORE_PATH)
+    args = parser.parse_args()
+    imported = MatchStore(args.db).import_json_dir(args.directory)
+    print(f"Imported {imported} matches into {args.db}")
@@ -0,0 +1,162 @@
+# metrics.py
+import bisect
+import functools
+import threading
+import time
+
+from dash.exceptions import PreventUpdate
+from flask import Response, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """In-process counters and histograms rendered in the Prometheus text format.
+
+    Recording is a dict lookup and a few increments under one lock, cheap enough to leave on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (h.buckets, list(h.counts), h.total, h.count) for key, h in self._histograms.items()
+            }
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(float(bound))),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+registry = Registry()
+registry.describe("aoe4_callback_seconds", "Dash callback latency")
+registry.describe("aoe4_upstream_seconds", "aoe4world API request latency")
+registry.describe("aoe4_upstream_response_bytes", "aoe4world API response body size")
+registry.describe("aoe4_cache_requests_total", "Cache lookups by cache and outcome")
+registry.describe("aoe4_http_request_bytes", "Dash update request body size")
+registry.describe("aoe4_http_response_bytes", "Dash update response body size")
+
+
+def record_cache(cache_name, hit):
+    registry.inc("aoe4_cache_requests_total", (("cache", cache_name), ("result", "hit" if hit else "miss")))
+
+
+def record_upstream(endpoint, status, seconds, size):
+    labels = (("endpoint", endpoint), ("status", str(status)))
+    registry.observe("aoe4_upstream_seconds", seconds, labels)
+    if size is not None:
+        registry.observe("aoe4_upstream_response_bytes", size, (("endpoint", endpoint),), SIZE_BUCKETS)
+
+
+def timed_callback(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outcome = "ok"
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            outcome = "prevented"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            registry.observe(
+                "aoe4_callback_seconds",
+                time.perf_counter() - start,
+                (("callback", func.__name__), ("outcome", outcome)),
+            )
+    return wrapper
+
+
+def instrumented_callback(app):
+    # Drop-in replacement for app.callback that records latency for the decorated function
+    def callback(*args, **kwargs):
+        def decorator(func):
+            return app.callback(*args, **kwargs)(timed_callback(func))
+        return decorator
+    return callback
+
+
+def register_metrics_route(server):
+    @server.after_request
+    def record_payload_sizes(response):
+        if request.path.endswith("/_dash-update-component"):
+            if request.content_length is not None:
+                registry.observe("aoe4_http_request_bytes", request.content_length, buckets=SIZE_BUCKETS)
+            if response.content_length is not None:
+                registry.observe("aoe4_http_response_bytes", response.content_length, buckets=SIZE_BUCKETS)
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
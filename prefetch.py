@@ -0,0 +1,111 @@
+# prefetch.py
+import logging
+import os
+import random
+import sys
+import threading
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: the development server runs a single process anyway
+    fcntl = None
+
+from api_client import RECENT_LIMIT, get_client
+from match_cache import get_match_cache
+from match_store import STORE_PATH, get_store
+from scouting import scout_opponents
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated profile IDs to keep warm, e.g. AOE4_WATCH_LIST="1234,5678"
+WATCH_LIST = os.environ.get("AOE4_WATCH_LIST", "")
+PREFETCH_INTERVAL = float(os.environ.get("AOE4_PREFETCH_INTERVAL", "300"))
+PREFETCH_JITTER = 0.2
+# Pause between players within one sweep, on top of the client's rate limit
+PLAYER_SPACING = 1.0
+# Every gunicorn worker starts a PrefetchWorker, but only the one holding this lock refreshes;
+# the others wait on it and take over if that process exits
+LOCK_PATH = os.environ.get(
+    "AOE4_PREFETCH_LOCK", os.path.join(os.path.dirname(os.path.abspath(STORE_PATH)), "prefetch.lock")
+)
+
+
+class PrefetchWorker(threading.Thread):
+    """Periodically refreshes recent games for watched players into the API cache, match cache and store."""
+
+    def __init__(self, player_ids, interval=PREFETCH_INTERVAL, jitter=PREFETCH_JITTER, client=None, store=None,
+                 lock_path=LOCK_PATH):
+        super().__init__(name="aoe4-prefetch", daemon=True)
+        self.lock_path = lock_path
+        self.player_ids = list(player_ids)
+        self.interval = interval
+        self.jitter = jitter
+        self.client = client
+        self.store = store
+        self._stop_event = threading.Event()
+
+    def _jittered(self, seconds):
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def refresh(self, player_id):
+        client = self.client or get_client()
+        # Keep the page cached past the next refresh so clicks never wait on upstream
+        data = client.refresh_games(player_id, RECENT_LIMIT, ttl=self.interval * 2)
+        games = data.get("games") or []
+        store = self.store or get_store()
+        get_match_cache().add(games, store)
+        if games:
+            # Opening the latest match then finds its opponents' scouting reports already cached
+            latest = max(games, key=lambda game: game["started_at"])
+            scout_opponents(latest, player_id, store=store, client=client)
+        return len(games)
+
+    def _wait_for_leadership(self):
+        # Blocks until this process holds the lock; the OS drops it when the holder exits
+        if fcntl is None or not self.lock_path:
+            return None
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        lock_file = open(self.lock_path, "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def run(self):
+        self._lock_file = self._wait_for_leadership()
+        # Stagger start-up so several workers/processes don't refresh in lockstep
+        if self._stop_event.wait(self._jittered(min(self.interval, 10))):
+            return
+        while not self._stop_event.is_set():
+            for player_id in self.player_ids:
+                try:
+                    self.refresh(player_id)
+                except requests.exceptions.RequestException as e:
+                    logger.warning("Prefetch for %s failed: %s", player_id, e)
+                if self._stop_event.wait(self._jittered(PLAYER_SPACING)):
+                    return
+            self._stop_event.wait(self._jittered(self.interval))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_prefetch_worker(player_ids=None, interval=PREFETCH_INTERVAL):
+    global _worker
+    # Pool processes started with spawn or forkserver re-import the app module; only the server prefetches
+    multiprocessing = sys.modules.get("multiprocessing")
+    if multiprocessing is not None and multiprocessing.parent_process() is not None:
+        return None
+    if player_ids is None:
+        player_ids = [player_id.strip() for player_id in WATCH_LIST.split(",") if player_id.strip()]
+    if not player_ids:
+        return None
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = PrefetchWorker(player_ids, interval)
+            _worker.start()
+    return _worker
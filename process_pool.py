@@ -0,0 +1,11 @@
+# process_pool.py
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def make_process_pool(max_workers=None):
+    # Pools are started from processes already running threads that hold sockets and SQLite connections
+    # (the Dash server, ingest's fetch threads); forkserver (spawn on Windows) starts the children from a
+    # clean single-threaded process instead of forking that state
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method))
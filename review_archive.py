@@ -0,0 +1,152 @@
+# review_archive.py
+import argparse
+import io
+import json
+import os
+import zipfile
+
+from flask import Response
+
+from match_store import get_store
+from review_format import decode_review
+
+ZIP_MAGIC = b"PK\x03\x04"
+
+# Below this many files the process pool costs more to start than it saves
+PROCESS_POOL_THRESHOLD = 32
+
+
+class _ChunkBuffer:
+    # Write-only, unseekable sink: zipfile falls back to data descriptors and never seeks back
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_archive_chunks(store=None, reviewed_only=True):
+    # Yields the zip archive piece by piece: one compressed review per member
+    store = store or get_store()
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for match in store.iter_matches(reviewed_only=reviewed_only):
+            archive.writestr(
+                f"{match['game_id']}.json",
+                json.dumps(match, ensure_ascii=False, separators=(",", ":")),
+            )
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def export_archive(path, store=None, reviewed_only=True):
+    with open(path, "wb") as archive_file:
+        for chunk in iter_archive_chunks(store, reviewed_only):
+            archive_file.write(chunk)
+    return path
+
+
+def _iter_payloads(name, raw):
+    if raw[:4] == ZIP_MAGIC:
+        with zipfile.ZipFile(io.BytesIO(raw)) as archive:
+            for member in archive.infolist():
+                if not member.is_dir():
+                    yield f"{name}/{member.filename}", archive.read(member)
+    else:
+        yield name, raw
+
+
+def _parse_payload(item):
+    name, raw = item
+    try:
+        match = decode_review(raw)
+    except (ValueError, OSError, EOFError) as e:
+        return name, None, str(e)
+    if not isinstance(match, dict) or "game_id" not in match:
+        return name, None, "not a saved match"
+    return name, match, None
+
+
+def import_reviews(files, store=None, progress=None, workers=None):
+    # files: iterable of (filename, raw bytes), each either a single review or a zip archive
+    store = store or get_store()
+    payloads = [payload for name, raw in files for payload in _iter_payloads(name, raw)]
+    total = len(payloads)
+
+    if total >= PROCESS_POOL_THRESHOLD:
+        # multiprocessing is only needed for large imports, so keep it out of worker boot
+        from process_pool import make_process_pool
+
+        with make_process_pool(workers) as executor:
+            parsed = executor.map(_parse_payload, payloads, chunksize=16)
+            matches, errors = _dedupe(parsed, total, progress)
+    else:
+        matches, errors = _dedupe(map(_parse_payload, payloads), total, progress)
+
+    imported = store.save_matches((match, None) for match in matches.values())
+    return {
+        "files": total,
+        "imported": imported,
+        "duplicates": total - imported - len(errors),
+        "errors": errors,
+    }
+
+
+def _dedupe(parsed, total, progress):
+    # Later copies of a game win unless they would drop an existing review
+    matches = {}
+    errors = {}
+    for done, (name, match, error) in enumerate(parsed, start=1):
+        if error is not None:
+            errors[name] = error
+        else:
+            existing = matches.get(match["game_id"])
+            if existing is None or "player-input" in match or "player-input" not in existing:
+                matches[match["game_id"]] = match
+        if progress:
+            progress(done, total)
+    return matches, errors
+
+
+def register_archive_routes(server):
+    @server.route("/export/reviews.zip")
+    def export_reviews():
+        return Response(
+            iter_archive_chunks(),
+            mimetype="application/zip",
+            headers={"Content-Disposition": "attachment; filename=aoe4_reviews.zip"},
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk export or import saved reviews")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("path")
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_archive(args.path)
+        print(f"Exported reviews to {args.path}")
+    else:
+        def read_files():
+            for path in args.paths:
+                with open(path, "rb") as review_file:
+                    yield os.path.basename(path), review_file.read()
+
+        def report(done, total):
+            print(f"\rParsed {done}/{total}", end="", flush=True)
+
+        summary = import_reviews(read_files(), progress=report)
+        print(f"\nImported {summary['imported']} matches, {summary['duplicates']} duplicates, {len(summary['errors'])} errors")
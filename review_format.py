@@ -0,0 +1,13 @@
+# review_format.py
+import gzip
+import json
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def decode_review(raw):
+    # Sniffs the format from the leading bytes, so old indented .json files keep loading.
+    # json.loads accepts bytes directly, which avoids a separate str copy of the payload.
+    if raw[:2] == GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return json.loads(raw)
@@ -0,0 +1,137 @@
+# scouting.py
+import asyncio
+import time
+
+import constants
+from api_client import fetch_games_batch
+from cache_backend import make_cache
+from match_store import get_store
+
+# Recent games per opponent that feed a report
+SCOUT_GAMES = 20
+# Reports younger than this are served without contacting aoe4world
+SCOUT_MAX_AGE = 15 * 60
+# Older reports stay cached so a refresh only has to fold in the games played since
+REPORT_TTL = 7 * 24 * 3600
+# Game ids remembered per report to recognise games that were already counted
+SEEN_LIMIT = 200
+RECENT_CIVS = 10
+
+_report_cache = make_cache("scouting", maxsize=2048, ttl=REPORT_TTL)
+
+
+def opponent_ids(match, my_profile_id):
+    # Everyone not on the reviewer's team; when the reviewer didn't play, every player
+    my_team = None
+    for team_index, team in enumerate(match.get("teams", [])):
+        if any(str(entry["player"]["profile_id"]) == str(my_profile_id) for entry in team):
+            my_team = team_index
+    return [
+        entry["player"]["profile_id"]
+        for team_index, team in enumerate(match.get("teams", []))
+        if team_index != my_team
+        for entry in team
+    ]
+
+
+def new_report(profile_id):
+    return {
+        "profile_id": profile_id,
+        "name": None,
+        "games": 0,
+        "wins": 0,
+        "decided": 0,
+        "duration_total": 0,
+        "duration_games": 0,
+        "civs": {},
+        "recent_civs": [],
+        "landmarks": {},
+        "seen": [],
+        "updated_at": 0,
+    }
+
+
+def update_report(report, games, profile_id):
+    # Folds in only the games this report hasn't counted yet; games arrive newest-first
+    report = dict(report, civs={civ: list(counts) for civ, counts in report["civs"].items()})
+    seen = set(report["seen"])
+    new_ids = []
+    recent_civs = []
+    for game in games:
+        player = next(
+            (entry["player"] for team in game.get("teams", []) for entry in team
+             if str(entry["player"]["profile_id"]) == str(profile_id)),
+            None,
+        )
+        if player is None:
+            continue
+        civ = constants.normalize_civ(player.get("civilization"))
+        recent_civs.append(civ)
+        if game["game_id"] in seen:
+            continue
+        new_ids.append(game["game_id"])
+        report["name"] = report["name"] or player.get("name")
+        report["games"] += 1
+        civ_counts = report["civs"].setdefault(civ, [0, 0])
+        civ_counts[0] += 1
+        if player.get("result") in ("win", "loss"):
+            report["decided"] += 1
+            if player["result"] == "win":
+                report["wins"] += 1
+                civ_counts[1] += 1
+        if game.get("duration"):
+            report["duration_total"] += game["duration"]
+            report["duration_games"] += 1
+
+    if recent_civs:
+        report["recent_civs"] = recent_civs[:RECENT_CIVS]
+    report["seen"] = (new_ids + report["seen"])[:SEEN_LIMIT]
+    report["updated_at"] = time.time()
+    return report
+
+
+def civ_summary(report):
+    # [(civ, games, win rate or None)], most played first
+    return sorted(
+        ((civ, games, wins / games if games else None) for civ, (games, wins) in report["civs"].items()),
+        key=lambda row: -row[1],
+    )
+
+
+def average_duration(report):
+    if not report["duration_games"]:
+        return None
+    return report["duration_total"] / report["duration_games"]
+
+
+def scout_players(profile_ids, max_age=SCOUT_MAX_AGE, store=None, client=None):
+    # Cached reports are returned as-is; the rest are fetched together and updated in place
+    reports = {}
+    stale = []
+    for profile_id in profile_ids:
+        report = _report_cache.get(str(profile_id))
+        if report is not None and time.time() - report["updated_at"] < max_age:
+            reports[profile_id] = report
+        else:
+            stale.append(profile_id)
+
+    if stale:
+        store = store or get_store()
+        results = asyncio.run(fetch_games_batch(stale, SCOUT_GAMES, client=client))
+        for profile_id, data in results.items():
+            previous = _report_cache.get(str(profile_id))
+            if "error" in data:
+                # An outdated report beats none while aoe4world is unavailable
+                if previous is not None:
+                    reports[profile_id] = previous
+                continue
+            report = update_report(previous or new_report(profile_id), data.get("games") or [], profile_id)
+            report["landmarks"] = store.review_landmarks(profile_id)
+            _report_cache.set(str(profile_id), report)
+            reports[profile_id] = report
+
+    return [reports[profile_id] for profile_id in profile_ids if profile_id in reports]
+
+
+def scout_opponents(match, my_profile_id, **kwargs):
+    return scout_players(opponent_ids(match, my_profile_id), **kwargs)
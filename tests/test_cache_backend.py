@@ -0,0 +1,51 @@
+# tests/test_cache_backend.py
+import pytest
+
+from cache_backend import CacheBackend, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend("test", maxsize=16, ttl=60, path=str(tmp_path / "cache.sqlite3"))
+    return MemoryBackend("test", maxsize=16, ttl=60)
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_round_trip(cache):
+    cache.set(("1001", 20), {"games": [1]})
+    assert cache.get(("1001", 20)) == {"games": [1]}
+    cache.delete(("1001", 20))
+    assert cache.get(("1001", 20), "missing") == "missing"
+
+
+def test_fresh_items_prefix(cache):
+    cache.set(("10", 20), "a")
+    cache.set(("10", 50), "b")
+    cache.set(("100", 20), "c")
+    cache.set(("1", 20), "d")
+    cache.set(("10", 5), "expired", ttl=-1)
+    assert sorted(cache.fresh_items(60, prefix=("10",))) == [(("10", 20), "a"), (("10", 50), "b")]
+    assert len(cache.fresh_items(60)) == 4
+    assert cache.fresh_items(60, prefix=("2",)) == []
+
+
+def test_sqlite_hits_only_touch_stale_entries(tmp_path):
+    cache = SQLiteBackend("test", maxsize=16, ttl=100, path=str(tmp_path / "cache.sqlite3"))
+    cache.set("key", "value")
+    conn = cache._connection()
+
+    def accessed_at():
+        return conn.execute("SELECT accessed_at FROM cache WHERE key = ?", (cache._encode_key("key"),)).fetchone()[0]
+
+    stored = accessed_at()
+    assert cache.get("key") == "value"
+    assert accessed_at() == stored
+
+    conn.execute("UPDATE cache SET accessed_at = accessed_at - 50")
+    assert cache.get("key") == "value"
+    assert accessed_at() > stored
@@ -0,0 +1,35 @@
+# tests/test_constants.py
+import os
+
+import pytest
+
+import constants
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+
+def test_assets_match_civs():
+    assert constants.validate_assets(ASSETS_DIR) == []
+
+
+@pytest.mark.parametrize("alias", sorted(constants.CIV_ALIASES))
+def test_alias_resolves_to_known_civ(alias):
+    civ = constants.normalize_civ(alias)
+    assert civ in constants.LANDMARKS
+    assert constants.landmarks_for(alias) is constants.LANDMARKS[civ]
+
+
+@pytest.mark.parametrize("slug, civ", [
+    ("Holy Roman Empire", "holy_roman_empire"),
+    ("zhu-xis-legacy", "zhu_xis_legacy"),
+    ("Jeanne d'Arc", "jeanne_darc"),
+    ("HRE", "holy_roman_empire"),
+])
+def test_normalize_civ_spellings(slug, civ):
+    assert constants.normalize_civ(slug) == civ
+
+
+def test_unknown_civ_has_no_landmarks():
+    assert constants.normalize_civ(None) is None
+    assert constants.civ_asset("not_a_civ") is None
+    assert constants.landmarks_for("not_a_civ") is constants.NO_LANDMARKS
@@ -0,0 +1,51 @@
+# tests/test_history.py
+import json
+import os
+
+import history
+
+
+class FakeClient:
+    """Serves a newest-first history of `count` games for one player, `page_size` per page."""
+
+    def __init__(self, count):
+        self.count = count
+
+    def get_games_page(self, player_id, page=1, limit=50):
+        newest = self.count - (page - 1) * limit
+        return {"games": [
+            {"game_id": game_id, "started_at": f"2024-01-01T{game_id // 3600:02d}:{game_id // 60 % 60:02d}:{game_id % 60:02d}Z"}
+            for game_id in range(newest, max(newest - limit, 0), -1)
+        ]}
+
+
+def _game_ids(directory, player_id="1001"):
+    with open(os.path.join(directory, f"{player_id}.jsonl"), encoding="utf-8") as games_file:
+        return [json.loads(line)["game_id"] for line in games_file]
+
+
+def test_page_limited_runs_then_full_run_write_each_game_once(tmp_path):
+    client = FakeClient(500)
+    assert history.sync_history("1001", str(tmp_path), page_size=50, max_pages=2, client=client) == 100
+    client.count = 520
+    assert history.sync_history("1001", str(tmp_path), page_size=50, max_pages=2, client=client) == 20
+    assert history.load_watermark("1001", str(tmp_path)) == {"pending_offset": 0}
+
+    assert history.sync_history("1001", str(tmp_path), page_size=50, client=client) == 400
+    game_ids = _game_ids(str(tmp_path))
+    assert len(game_ids) == len(set(game_ids)) == 520
+    assert history.load_watermark("1001", str(tmp_path))["game_id"] == 520
+
+
+def test_partial_run_after_complete_sync_resumes_to_watermark(tmp_path):
+    client = FakeClient(100)
+    history.sync_history("1001", str(tmp_path), page_size=10, client=client)
+    client.count = 150
+    assert history.sync_history("1001", str(tmp_path), page_size=10, max_pages=2, client=client) == 20
+    assert history.load_watermark("1001", str(tmp_path))["game_id"] == 100
+
+    assert history.sync_history("1001", str(tmp_path), page_size=10, client=client) == 30
+    assert history.sync_history("1001", str(tmp_path), page_size=10, client=client) == 0
+    game_ids = _game_ids(str(tmp_path))
+    assert sorted(game_ids) == list(range(1, 151))
+    assert history.load_watermark("1001", str(tmp_path)) == {"game_id": 150, "started_at": "2024-01-01T00:02:30Z"}
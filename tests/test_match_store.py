@@ -0,0 +1,80 @@
+# tests/test_match_store.py
+import pytest
+
+from benchmarks.synthetic import synthetic_match
+from match_store import MatchStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MatchStore(str(tmp_path / "matches.sqlite3"))
+
+
+@pytest.fixture
+def match(store):
+    match = synthetic_match(1001)
+    store.save_match(match)
+    return match
+
+
+def _profile_id(match):
+    return match["teams"][0][0]["player"]["profile_id"]
+
+
+def test_update_review_fields_needs_a_stored_match(store):
+    assert not store.update_review_fields(42, 1, {"strategy-input": "boom"})
+
+
+def test_update_review_fields_merges(store, match):
+    profile_id = _profile_id(match)
+    assert store.update_review_fields(match["game_id"], profile_id, {"strategy-input": "tower rush"})
+    assert store.update_review_fields(match["game_id"], profile_id, {"feudal-time": "04:30"})
+
+    review = store.get_match(match["game_id"])["player-input"]
+    assert review == {str(profile_id): {"strategy-input": "tower rush", "feudal-time": "04:30"}}
+
+
+def test_update_review_fields_none_removes_field(store, match):
+    profile_id = _profile_id(match)
+    store.update_review_fields(match["game_id"], profile_id, {"strategy-input": "tower rush", "feudal-time": "04:30"})
+    store.update_review_fields(match["game_id"], profile_id, {"strategy-input": None})
+
+    review = store.get_match(match["game_id"])["player-input"]
+    assert review == {str(profile_id): {"feudal-time": "04:30"}}
+
+
+def test_update_review_fields_refreshes_search(store, match):
+    profile_id = _profile_id(match)
+    store.update_review_fields(match["game_id"], profile_id, {"strategy-input": "tower rush"})
+    assert [summary["game_id"] for summary in store.search_reviews("tower")[0]] == [match["game_id"]]
+
+    store.update_review_fields(match["game_id"], profile_id, {"strategy-input": "fast castle"})
+    assert store.search_reviews("tower") == ([], 0)
+    assert store.search_reviews("castle")[1] == 1
+
+
+def test_fingerprint_ignores_resaved_matches(store, match):
+    profile_id = _profile_id(match)
+    reviewed = synthetic_match(1002)
+    store.save_match(reviewed, {str(profile_id): {"strategy-input": "tower rush"}})
+    fingerprint = store.fingerprint()
+
+    store.save_matches([(match, None), (reviewed, None), (synthetic_match(1003), None)])
+    store.save_match(reviewed, {str(profile_id): {"strategy-input": "tower rush"}})
+    assert store.fingerprint() == fingerprint
+
+    store.update_review_fields(match["game_id"], profile_id, {"strategy-input": "fast castle"})
+    assert store.fingerprint() != fingerprint
+    assert store.fingerprint()[0] == 2
+
+
+def test_old_store_gains_review_updated_at(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    store = MatchStore(path)
+    with store.connection() as conn:
+        conn.execute("DROP INDEX idx_matches_review_updated")
+        conn.execute("ALTER TABLE matches DROP COLUMN review_updated_at")
+        conn.execute(
+            "INSERT INTO matches (game_id, started_at, match_json, player_input, updated_at) VALUES (1, '2024', '{}', '{}', 5)"
+        )
+    assert MatchStore(path).fingerprint() == (1, 5)
@@ -0,0 +1,21 @@
+# tests/test_review_archive.py
+import gzip
+import json
+
+from benchmarks.synthetic import synthetic_match
+from match_store import MatchStore
+from review_archive import PROCESS_POOL_THRESHOLD, import_reviews
+
+
+def test_import_reviews_through_process_pool(tmp_path):
+    store = MatchStore(str(tmp_path / "matches.sqlite3"))
+    files = [
+        (f"{game_id}.json.gz", gzip.compress(json.dumps(synthetic_match(game_id)).encode("utf-8")))
+        for game_id in range(PROCESS_POOL_THRESHOLD + 8)
+    ]
+    files.append(("broken.json", b"{"))
+
+    result = import_reviews(files, store, workers=2)
+    assert result["imported"] == PROCESS_POOL_THRESHOLD + 8
+    assert list(result["errors"]) == ["broken.json"]
+    assert store.count_matches() == PROCESS_POOL_THRESHOLD + 8
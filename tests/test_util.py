@@ -0,0 +1,62 @@
+# tests/test_util.py
+import pytest
+
+import api_client
+import match_cache
+import match_store
+import util
+from benchmarks.stub_server import start_stub_server
+
+
+@pytest.fixture
+def app_state(tmp_path, monkeypatch):
+    server, base_url = start_stub_server()
+    store = match_store.MatchStore(str(tmp_path / "matches.sqlite3"))
+    monkeypatch.setattr(match_store, "_store", store)
+    monkeypatch.setattr(match_cache, "_cache", match_cache.MatchCache(backend="memory"))
+    previous_client = api_client.get_client()
+    api_client.set_client(api_client.Aoe4WorldClient(base_url=base_url, rate_limit=None))
+    yield store
+    api_client.set_client(previous_client)
+    server.shutdown()
+
+
+def _reviewed_last_match(player_id):
+    match = util.get_last_match_data(player_id)
+    profile_id = match["teams"][0][0]["player"]["profile_id"]
+    assert util.autosave_review_fields(match["game_id"], profile_id, {"strategy-input": "fast castle"})
+    return match["game_id"], str(profile_id)
+
+
+def test_listing_recent_games_keeps_autosaved_review(app_state):
+    game_id, profile_id = _reviewed_last_match("1001")
+    util.load_match_page({"source": "recent", "player_ids": ["1001"], "page": 0})
+
+    expected = {profile_id: {"strategy-input": "fast castle"}}
+    assert util.resolve_match(game_id)["player-input"] == expected
+    assert util.export_review(game_id)["match"]["player-input"] == expected
+
+
+def test_reviews_survive_an_evicted_cache(app_state):
+    game_id, profile_id = _reviewed_last_match("1001")
+    match_cache.get_match_cache().clear()
+    util.load_match_page({"source": "recent", "player_ids": ["1001"], "page": 0})
+
+    assert util.resolve_match(game_id)["player-input"] == {profile_id: {"strategy-input": "fast castle"}}
+
+
+def test_fetch_opens_last_match_with_its_review(app_state):
+    game_id, profile_id = _reviewed_last_match("1001")
+    match = util.get_last_match_data("1001")
+
+    assert match["game_id"] == game_id
+    assert match["player-input"] == {profile_id: {"strategy-input": "fast castle"}}
+
+
+def test_reopened_match_shows_autosaved_fields(app_state):
+    game_id, profile_id = _reviewed_last_match("1001")
+    util.load_match_page({"source": "recent", "player_ids": ["1001"], "page": 0})
+
+    my_team, _, _, handle = util.match_info_to_display(util.resolve_match(game_id), profile_id)
+    assert handle == game_id
+    assert "fast castle" in str(my_team)
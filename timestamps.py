@@ -0,0 +1,47 @@
+# timestamps.py
+from datetime import datetime, timezone
+from functools import lru_cache
+
+_local_tz = None
+
+
+def local_timezone():
+    # tzlocal inspects the environment/filesystem, so resolve the zone once per process
+    global _local_tz
+    if _local_tz is None:
+        import tzlocal
+
+        _local_tz = tzlocal.get_localzone()
+    return _local_tz
+
+
+@lru_cache(maxsize=8192)
+def parse_utc(time_str):
+    # aoe4world timestamps look like 2024-08-01T12:34:56.000Z
+    try:
+        dt = datetime.fromisoformat(time_str.replace("Z", "+00:00"))
+    except ValueError:
+        dt = datetime.strptime(time_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+@lru_cache(maxsize=8192)
+def convert_time_string(time_str, for_persist=False):
+    dt_local = parse_utc(time_str).astimezone(local_timezone())
+    if for_persist:
+        return dt_local.strftime("%Y-%m-%d_%H_%M_%S")
+    return dt_local.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def convert_time_strings(time_strs, for_persist=False):
+    # Converts a whole page of started_at values, formatting each distinct value once
+    converted = {}
+    result = []
+    for time_str in time_strs:
+        value = converted.get(time_str)
+        if value is None:
+            value = converted[time_str] = convert_time_string(time_str, for_persist)
+        result.append(value)
+    return result
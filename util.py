@@ -1,42 +1,87 @@
 # utils.py
-import os
+import asyncio
+import hashlib
 import json
-import pytz
-import tzlocal
 import requests
-from datetime import datetime
 import dash_bootstrap_components as dbc
 from dash import html, dcc
 import constants
+from api_client import fetch_games_batch, get_client
+from cache_backend import make_cache
+from match_store import REVIEW_LANDMARK_FIELDS, get_store
+from match_cache import get_match_cache
+from scouting import average_duration, civ_summary, scout_opponents
+from timestamps import convert_time_string, convert_time_strings
+
+# Per-civ fragments shared by every player card, built once at import
+LANDMARK_OPTIONS = {
+    civ: {age: [{"label": landmark, "value": landmark} for landmark in landmarks] for age, landmarks in ages.items()}
+    for civ, ages in constants.LANDMARKS.items()
+}
+NO_LANDMARK_OPTIONS = {age: [] for age in constants.AGES}
+CIV_IMAGES = {
+    civ: html.Img(
+        src=constants.civ_asset(civ),
+        className="inline-block ml-6 h-auto w-12 object-contain align-bottom"
+    )
+    for civ in constants.LANDMARKS
+}
+
+def civ_fragments(civilization):
+    civ = constants.normalize_civ(civilization)
+    if civ in CIV_IMAGES:
+        return LANDMARK_OPTIONS[civ], CIV_IMAGES[civ]
+    # Civs missing from the landmark table still render, with a text label and empty dropdowns
+    return NO_LANDMARK_OPTIONS, html.Span(str(civilization or "unknown").replace("_", " ").title(), className="ml-6 text-sm align-bottom")
+
+MATCH_LIST_PAGE_SIZE = 10
+# Milliseconds of typing pause before a review field is sent to the server for autosave
+AUTOSAVE_DEBOUNCE = 2000
+REVIEW_FIELDS = (
+    "feudal-time", "feudal-dropdown", "castle-time", "castle-dropdown",
+    "empire-time", "empire-dropdown", "strategy-input", "improve-input",
+)
+RENDER_CACHE_TTL = 24 * 3600
+
+_player_card_cache = make_cache("player_card", maxsize=1024, ttl=RENDER_CACHE_TTL)
 
 def fetch_recent_matches(player_id, limit=10):
-    api_url = f"https://aoe4world.com/api/v0/players/{player_id}/games?limit={limit}"
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()
-        return response.json()
+        return get_client().get_games(player_id, limit)
     except requests.exceptions.RequestException as e:
         return {"error": str(e)}
 
+def parse_player_ids(value):
+    if not value:
+        return []
+    return [player_id for player_id in value.replace(",", " ").split() if player_id]
+
+def fetch_recent_matches_for_players(player_ids, limit=10):
+    # Merges every player's recent games into one newest-first page, dropping shared games
+    results = asyncio.run(fetch_games_batch(player_ids, limit))
+    games = {}
+    errors = {}
+    for player_id, data in results.items():
+        if "error" in data:
+            errors[player_id] = data["error"]
+            continue
+        for game in data.get("games", []):
+            games.setdefault(game["game_id"], game)
+    merged = {"games": sorted(games.values(), key=lambda game: game["started_at"], reverse=True)}
+    if errors:
+        merged["errors"] = errors
+    return merged
+
+def fetch_recent_matches_for_match(match, limit=10):
+    player_ids = [str(player_info["profile_id"]) for player_info in get_player_info_from_last_match(match)]
+    return fetch_recent_matches_for_players(player_ids, limit)
+
 def fetch_data(player_id):
-    api_url = f"https://aoe4world.com/api/v0/players/{player_id}/games?limit=1"
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()
-        return response.json()
+        return get_client().get_latest_games(player_id)
     except requests.exceptions.RequestException as e:
         return {"error": str(e)}
 
-def convert_time_string(time_str, for_persist=False):
-    dt = datetime.strptime(time_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-    dt_utc = dt.replace(tzinfo=pytz.UTC)
-    local_tz = tzlocal.get_localzone() 
-    dt_local = dt_utc.astimezone(local_tz)
-
-    if for_persist:
-        return dt_local.strftime("%Y-%m-%d_%H_%M_%S")
-    return dt_local.strftime("%Y-%m-%d %H:%M:%S")
-
 def sec_to_min(sec):
     if sec is None:
         return "N/A"
@@ -44,9 +89,10 @@ def sec_to_min(sec):
     remaining_seconds = sec % 60
     return f"{minutes:02}:{remaining_seconds:02}"
 
-def get_game_info_from_match(match, for_persist=False):
+def get_game_info_from_match(match, for_persist=False, start_time=None):
     game_id = match["game_id"]
-    start_time = convert_time_string(match["started_at"], for_persist)
+    if start_time is None:
+        start_time = convert_time_string(match["started_at"], for_persist)
     duration = sec_to_min(match["duration"])
     map_name = match["map"]
     kind = match["kind"]
@@ -55,39 +101,99 @@ def get_game_info_from_match(match, for_persist=False):
         return f"{start_time},{map_name},{kind}"
     return f"Map: {map_name} | Time: {start_time} | Duration: {duration} |  Kind: {kind} | MMR: {avg_mmr}"
 
-def save_match_data(match_data, match_name):
-    directory = "./data"
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    filepath = os.path.join(directory, f"{match_name}.json")
-    with open(filepath, 'w', encoding='utf-8') as json_file:
-        json.dump(match_data, json_file, ensure_ascii=False, indent=4)
-    return filepath
+def remember_matches(matches):
+    # The match cache is per process by default, so matches are also written through to the store:
+    # a handle sent to the browser must resolve on whichever worker gets the next request
+    return get_match_cache().add(matches, get_store())
 
-def deserialize_historical_match():
-    try:
-        files = os.listdir("./data")
-        links = [
-            html.Div(
-                html.A(file, id={'type': 'file-link', 'index': i}, className="cursor-pointer hover:text-blue-500")
-            ) 
-            for i, file in enumerate(files)
-        ]
-        return links
-    except FileNotFoundError:
-        return [html.Div("No saved matches found.", className="nav-text")]
+def remember_match(match):
+    return remember_matches([match])[0]
+
+def resolve_match(game_id):
+    if game_id is None:
+        return None
+    match = get_match_cache().get(game_id)
+    if match is None:
+        match = get_store().get_match(game_id)
+        if match is not None:
+            get_match_cache().put(match)
+    return match
+
+def autosave_review_fields(game_id, profile_id, changes):
+    # Writes only the edited fields; the full match is stored once, the first time it is edited
+    store = get_store()
+    if not store.update_review_fields(game_id, profile_id, changes):
+        match = resolve_match(game_id)
+        if match is None:
+            return False
+        store.save_match(match, match.get("player-input") or {})
+        store.update_review_fields(game_id, profile_id, changes)
+    # The cached copy still carries the old player-input; the store is now the source of truth
+    get_match_cache().delete(game_id)
+    return True
+
+def save_match_data(match_data):
+    return get_store().save_match(match_data)
+
+def export_review(game_id):
+    # Server half of the clientside download; the fields are already in the store through autosave
+    match = resolve_match(game_id)
+    if match is None:
+        return None
+    return {"filename": get_game_info_from_match(match, True), "match": match}
+
+def deserialize_historical_match(offset=0, limit=MATCH_LIST_PAGE_SIZE, **filters):
+    store = get_store()
+    return {
+        "games": store.list_matches(offset=offset, limit=limit, reviewed_only=True, **filters),
+        "total": store.count_matches(reviewed_only=True, **filters),
+    }
+
+def load_match_page(listing):
+    # listing: {"source": "recent" | "match" | "saved" | "search", "player_ids": [...], "game_id": id,
+    #           "query": str, "page": n}
+    # Only one page of games is ever sent to the browser, whatever the history length.
+    offset = listing.get("page", 0) * MATCH_LIST_PAGE_SIZE
+    if listing["source"] == "saved":
+        return deserialize_historical_match(offset, MATCH_LIST_PAGE_SIZE)
+    if listing["source"] == "search":
+        games, total = get_store().search_reviews(listing.get("query", ""), offset, MATCH_LIST_PAGE_SIZE)
+        return {"games": games, "total": total}
+
+    player_ids = listing.get("player_ids") or []
+    if listing["source"] == "match":
+        # Recent games of everyone in the open match
+        match = resolve_match(listing["game_id"])
+        recent_matches = fetch_recent_matches_for_match(match) if match is not None else {"games": []}
+    elif len(player_ids) > 1:
+        recent_matches = fetch_recent_matches_for_players(player_ids)
+    elif player_ids:
+        recent_matches = fetch_recent_matches(player_ids[0])
+    else:
+        recent_matches = {"games": []}
+    if "error" in recent_matches:
+        return {"games": [], "total": 0, "error": recent_matches["error"]}
+
+    games = recent_matches["games"]
+    remember_matches(games)
+    return {"games": games[offset:offset + MATCH_LIST_PAGE_SIZE], "total": len(games)}
 
 def display_recent_matches(data):
+    if not data["games"]:
+        return [html.Div(data.get("error", "No matches found."), className="nav-text")]
+    start_times = convert_time_strings([game["started_at"] for game in data["games"]])
     return [
         html.Div(
-            html.A(get_game_info_from_match(game), id={'type': 'game-link', 'index': i}, className="cursor-pointer hover:text-blue-500")
+            html.A(get_game_info_from_match(game, start_time=start_time), id={'type': 'game-link', 'index': i}, className="cursor-pointer hover:text-blue-500")
         ) 
-        for i, game in enumerate(data["games"])
+        for i, (game, start_time) in enumerate(zip(data["games"], start_times))
     ]
 
-def match_info_to_display(match, my_profile_id):
+def page_label(listing, total):
+    page_count = max(1, -(-total // MATCH_LIST_PAGE_SIZE))
+    return f"Page {listing.get('page', 0) + 1} of {page_count} ({total} matches)"
 
-    print(my_profile_id)
+def match_info_to_display(match, my_profile_id):
 
     user_input = match.get("player-input", None)
     player_info_list = get_player_info_from_last_match(match)
@@ -108,9 +214,9 @@ def match_info_to_display(match, my_profile_id):
     for player_info in player_info_list:
         cur_input = None
         if user_input:
-            cur_input = user_input[str(player_info["profile_id"])]
+            cur_input = user_input.get(str(player_info["profile_id"]))
 
-        player_card = generate_player_card(player_info, my_profile_id, cur_input)
+        player_card = cached_player_card(match["game_id"], player_info, my_profile_id, cur_input)
         if player_info['team'] == my_team_index:
             if str(player_info['profile_id']) == my_profile_id:
                 my_team_cards = [player_card] + my_team_cards
@@ -145,7 +251,7 @@ def match_info_to_display(match, my_profile_id):
         ),
         className="mb-3",
     )
-    return html.Div(my_team_cards), html.Div(opponent_team_cards), html.Div(game_info), {"display": "inline-block"}, match
+    return html.Div(my_team_cards), html.Div(opponent_team_cards), html.Div(game_info), remember_match(match)
 
     
 def get_player_info_from_last_match(last_match):
@@ -166,9 +272,21 @@ def get_player_info_from_last_match(last_match):
 
     return player_info
 
+def cached_player_card(game_id, player_info, my_profile_id, cur_input=None):
+    # The card only depends on the player and their saved input, so re-opening a match reuses it
+    # A stable digest, since the cache may be shared with other worker processes
+    input_hash = hashlib.sha1(json.dumps(cur_input, sort_keys=True).encode("utf-8")).hexdigest() if cur_input else None
+    key = (game_id, player_info['profile_id'], input_hash)
+    player_card = _player_card_cache.get(key)
+    if player_card is None:
+        player_card = generate_player_card(player_info, my_profile_id, cur_input)
+        _player_card_cache.set(key, player_card)
+    return player_card
+
 def generate_player_card(player_info, my_profile_id, cur_input = None):
     player_id = player_info['profile_id']
     isUser = player_id == my_profile_id
+    landmark_options, civ_image = civ_fragments(player_info['civilization'])
     player_card = dbc.Card(
         dbc.CardBody(
             [
@@ -183,10 +301,7 @@ def generate_player_card(player_info, my_profile_id, cur_input = None):
                                 f"MMR: {player_info['mmr']}",
                                 className="text-sm align-bottom ml-1"  # Smaller text with middle alignment
                             ),
-                            html.Img(
-                                src=f"./assets/{player_info['civilization']}.png",
-                                className="inline-block ml-6 h-auto w-12 object-contain align-bottom"
-                            )
+                            civ_image
                         ],
                         className="card-title hover:underline hover:text-blue-600 transition duration-300 ease-in-out flex items-center"
                     ),
@@ -197,12 +312,12 @@ def generate_player_card(player_info, my_profile_id, cur_input = None):
                 dbc.Row(
                     [
                         dbc.Col(html.Label("Feudal", className="mr-2"), width="auto", align="center"),
-                        dbc.Col(dbc.Input(type="time", id={"type": "feudal-time", "player_id": player_id}, className="mr-2", value=cur_input["feudal-time"] if cur_input else None)),
+                        dbc.Col(dbc.Input(type="time", id={"type": "feudal-time", "player_id": player_id}, className="mr-2", debounce=AUTOSAVE_DEBOUNCE, value=cur_input.get("feudal-time") if cur_input else None)),
                         dbc.Col(
                             dcc.Dropdown(
                                 id={"type": "feudal-dropdown", "player_id": player_id},
-                                options=constants.AOE4_LANDMARKS_BY_CIV[player_info['civilization']]['feudal'],
-                                value= cur_input["feudal-dropdown"] if cur_input else None,
+                                options=landmark_options['feudal'],
+                                value= cur_input.get("feudal-dropdown") if cur_input else None,
                                 className="mr-2"
                             ),
                         ),
@@ -213,12 +328,12 @@ def generate_player_card(player_info, my_profile_id, cur_input = None):
                 dbc.Row(
                     [
                         dbc.Col(html.Label("Castle", className="mr-2"), width="auto", align="center"),
-                        dbc.Col(dbc.Input(type="time", id={"type": "castle-time", "player_id": player_id}, className="mr-2", value= cur_input["castle-time"] if cur_input else None)),
+                        dbc.Col(dbc.Input(type="time", id={"type": "castle-time", "player_id": player_id}, className="mr-2", debounce=AUTOSAVE_DEBOUNCE, value= cur_input.get("castle-time") if cur_input else None)),
                         dbc.Col(
                             dcc.Dropdown(
                                 id={"type": "castle-dropdown", "player_id": player_id},
-                                options=constants.AOE4_LANDMARKS_BY_CIV[player_info['civilization']]['castle'],
-                                value=cur_input["castle-dropdown"] if cur_input else None,
+                                options=landmark_options['castle'],
+                                value=cur_input.get("castle-dropdown") if cur_input else None,
                                 className="mr-2"
                             ),
                         ),
@@ -229,12 +344,12 @@ def generate_player_card(player_info, my_profile_id, cur_input = None):
                 dbc.Row(
                     [
                         dbc.Col(html.Label("Empire", className="mr-2"), width="auto", align="center"),
-                        dbc.Col(dbc.Input(type="time", id={"type": "empire-time", "player_id": player_id}, className="mr-2", value= cur_input["empire-time"] if cur_input else None)),
+                        dbc.Col(dbc.Input(type="time", id={"type": "empire-time", "player_id": player_id}, className="mr-2", debounce=AUTOSAVE_DEBOUNCE, value= cur_input.get("empire-time") if cur_input else None)),
                         dbc.Col(
                             dcc.Dropdown(
                                 id={"type": "empire-dropdown", "player_id": player_id},
-                                options=constants.AOE4_LANDMARKS_BY_CIV[player_info['civilization']]['empire'],
-                                value=cur_input["empire-dropdown"] if cur_input else None,
+                                options=landmark_options['empire'],
+                                value=cur_input.get("empire-dropdown") if cur_input else None,
                                 className="mr-2"
                             ),
                         ),
@@ -249,7 +364,8 @@ def generate_player_card(player_info, my_profile_id, cur_input = None):
                                 id={"type": "strategy-input", "player_id": player_id},
                                 size="sm",
                                 className="mb-3",
-                                value=cur_input["strategy-input"] if cur_input else None,
+                                debounce=AUTOSAVE_DEBOUNCE,
+                                value=cur_input.get("strategy-input") if cur_input else None,
                                 placeholder="What is the game plan? Is it successful or not?",
                                 style={"height": "100px"}
                             ),
@@ -265,7 +381,8 @@ def generate_player_card(player_info, my_profile_id, cur_input = None):
                                 id={"type": "improve-input", "player_id": player_id},
                                 size="sm",
                                 className="mb-3",
-                                value=cur_input["improve-input"] if cur_input else None,
+                                debounce=AUTOSAVE_DEBOUNCE,
+                                value=cur_input.get("improve-input") if cur_input else None,
                                 placeholder="What are some areas to improve?",
                                 style={"height": "100px"}
                             ),
@@ -274,6 +391,7 @@ def generate_player_card(player_info, my_profile_id, cur_input = None):
                     style={"margin-bottom": "5px"},
                     align="center",
                 ),
+                html.Small(id={"type": "autosave-status", "player_id": player_id}, className="text-gray-500"),
             ]
         ), 
         className= "mb-3 bg-gray-50 shadow-sm hover:bg-gray-100 transition duration-300 hover:shadow-xl ease-in-out"
@@ -294,6 +412,54 @@ def get_last_match_data(player_id):
     if not games:
         return "No games found"
 
-    # Find the match with the biggest timestamp
+    # Find the match with the biggest timestamp; the cached or stored copy carries any saved review
     last_match = max(games, key=lambda x: x['started_at'])
-    return last_match
+    return resolve_match(remember_match(last_match))
+
+def scouting_report_card(report):
+    civ_rows = [
+        html.Li(
+            f"{civ.replace('_', ' ').title()}: {games} games"
+            + (f", {win_rate:.0%} won" if win_rate is not None else "")
+        )
+        for civ, games, win_rate in civ_summary(report)[:5]
+    ]
+    landmark_rows = []
+    for age, field in zip(constants.AGES, REVIEW_LANDMARK_FIELDS):
+        picks = report["landmarks"].get(field) or {}
+        if picks:
+            favourite = max(picks, key=picks.get)
+            landmark_rows.append(html.Li(f"{age.title()}: {favourite} ({picks[favourite]} of {sum(picks.values())} reviews)"))
+    duration = average_duration(report)
+    win_rate = f"{report['wins'] / report['decided']:.0%}" if report["decided"] else "N/A"
+    return dbc.Card(
+        dbc.CardBody(
+            [
+                html.H5(report["name"] or str(report["profile_id"]), className="text-lg font-bold"),
+                html.P(
+                    f"{report['games']} recent games | Win rate: {win_rate} | "
+                    f"Typical length: {sec_to_min(int(duration)) if duration else 'N/A'}",
+                    className="text-sm"
+                ),
+                html.P(
+                    "Last civs: " + ", ".join(civ.replace("_", " ").title() for civ in report["recent_civs"] if civ),
+                    className="text-sm"
+                ),
+                html.Ul(civ_rows, className="text-sm"),
+                html.Ul(landmark_rows, className="text-sm") if landmark_rows else None,
+            ]
+        ),
+        className="mb-3",
+    )
+
+def scouting_to_display(match, my_profile_id):
+    reports = scout_opponents(match, my_profile_id)
+    if not reports:
+        return None
+    return dbc.Card(
+        dbc.CardBody(
+            [html.H4("Opponent scouting", className="text-2xl font-semibold mb-3")]
+            + [scouting_report_card(report) for report in reports]
+        ),
+        className="mb-3",
+    )